@@ -6,3 +6,25 @@ DATABASE_CONFIG = {
     'password': '123456',  # Change this to your PostgreSQL password
     'port': '5432'
 }
+
+# Crawler Configuration
+CRAWLER_CONFIG = {
+    'max_workers': 1,  # Số Chrome driver crawl order book song song (tăng dần, giảm lại nếu bị MEXC rate limit)
+    'request_interval': 1,  # Số giây tối thiểu giữa 2 lần load trang order book, tính chung cho mọi worker (tăng nếu bị MEXC rate limit)
+    # Phase 1: đọc danh sách token từ HTML bằng requests + lxml trước, không có thì dùng Selenium
+    # Chưa đối chiếu symbol với bản Selenium trên site thật - chỉ bật sau khi đã kiểm tra
+    'token_list_http': False,
+    # Số row/trang yêu cầu qua ?pageSize= trên trang order book (None = không gửi)
+    # Chưa xác nhận trang MEXC có nhận tham số này - chỉ bật sau khi đã kiểm tra trên site thật
+    'orderbook_page_size': None,
+    # Chrome chạy sẵn để attach thay vì khởi động mới mỗi driver, vd: ['127.0.0.1:9222', '127.0.0.1:9223']
+    # (chrome --remote-debugging-port=9222 --user-data-dir=/tmp/mexc-profile-9222; mỗi worker 1 Chrome)
+    'chrome_debugger_addresses': [],
+    # Selenium Grid / Standalone Chrome thay cho Chrome local, vd: 'http://localhost:4444'
+    # (max_workers nên bằng số session của Grid, vd SE_NODE_MAX_SESSIONS=4 thì max_workers=4)
+    'selenium_grid_url': None,
+    # Thư mục giữ HTTP cache (JS/CSS của MEXC) giữa các lần chạy, vd: '/tmp/mexc_chrome_cache'
+    # Mỗi driver dùng 1 thư mục con riêng (0..max_workers-1); None = cache tạm, mất khi đóng Chrome
+    'chrome_disk_cache_dir': None,
+    'log_level': 'INFO',  # 'DEBUG' để in tiến độ chi tiết từng token/trang
+}
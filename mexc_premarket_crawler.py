@@ -6,25 +6,547 @@ Crawls order book data for MENTO token specifically
 Order type is determined by button content (Mua/Bán) not SELL/BUY
 """
 
+__all__ = ['MexcPreMarketCrawler', 'main']
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import time
 import re
+import os
+import shutil
+import io
+import csv
 from datetime import datetime
-import json
+from decimal import Decimal, InvalidOperation
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import execute_values
+import config
 from config import DATABASE_CONFIG
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from queue import Queue
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from queue import Queue, Empty
+from collections import namedtuple, deque
+
+try:
+    import lxml.html as lxml_html  # Optional: parse HTML trang pre-market không cần browser
+    from lxml import etree as lxml_etree
+except ImportError:
+    lxml_html = None
+    lxml_etree = None
+
+# config.py cũ chưa có CRAWLER_CONFIG vẫn chạy được - mọi option đều đọc bằng .get() có mặc định
+CRAWLER_CONFIG = getattr(config, 'CRAWLER_CONFIG', {})
+
+
+# CSS selectors của trang order book
+SELL_TABLE_SEL = ".order-book-table_sellTable__Dxd2s"
+BUY_TABLE_SEL = ".order-book-table_buyTable__xqBVW"
+# Row dữ liệu thật của bảng (bỏ measurement row và row placeholder "No data" Ant render trước khi có data)
+_DATA_ROW_SEL = ' tbody tr:not(.ant-table-measure-row):not(.ant-table-placeholder):not([aria-hidden="true"])'
+# Order book đã có data khi 1 trong 2 bảng có row dữ liệu
+ORDERBOOK_ROWS_SEL = f"{SELL_TABLE_SEL}{_DATA_ROW_SEL}, {BUY_TABLE_SEL}{_DATA_ROW_SEL}"
+SELL_PRICE_SEL = ".order-book-table_sellPrice__xAuZe"
+BUY_PRICE_SEL = ".order-book-table_buyPrice__uY0OB"
+CELL_CONTENT_SEL = ".order-book-table_content__ZSAZ_"
+PAGINATION_ITEM_SEL = ".ant-pagination-item"
+PAGINATION_ACTIVE_SEL = ".ant-pagination-item-active"
+
+# SELL orders pagination - first pagination wrapper
+SELL_PAGINATION_SELS = (
+    ".order-book-table_paginationWrapper__O_FJg:first-of-type",
+    ".order-book-table_sellTable__Dxd2s + .order-book-table_paginationWrapper__O_FJg",
+    ".ant-pagination",
+    "[class*='pagination']",
+)
+# BUY orders pagination - second pagination wrapper
+BUY_PAGINATION_SELS = (
+    ".order-book-table_buyTable__xqBVW .order-book-table_paginationWrapper__O_FJg",
+    ".order-book-table_buyTable__xqBVW + .order-book-table_paginationWrapper__O_FJg",
+    ".order-book-table_paginationWrapper__O_FJg:last-of-type",
+    ".ant-pagination",
+    "[class*='pagination']",
+)
+# Fallback
+DEFAULT_PAGINATION_SELS = (
+    ".order-book-table_paginationWrapper__O_FJg",
+    ".ant-pagination",
+    "[class*='pagination']",
+)
+
+
+def _pagination_selectors(table_selector):
+    """Chọn danh sách selector pagination theo loại bảng (SELL/BUY)"""
+    if table_selector == SELL_TABLE_SEL:
+        return SELL_PAGINATION_SELS
+    if table_selector == BUY_TABLE_SEL:
+        return BUY_PAGINATION_SELS
+    return DEFAULT_PAGINATION_SELS
+
+
+# Log chi tiết theo từng token/trang ở mức DEBUG - mặc định chỉ in tổng kết (xem CRAWLER_CONFIG['log_level'])
+log = logging.getLogger(__name__)
+
+# Trên ngưỡng này insert_order_books dùng COPY thay vì execute_values
+COPY_THRESHOLD = 10000
+
+PREMARKET_URL = 'https://www.mexc.com/vi-VN/pre-market'
+MEXC_ORIGIN = 'https://www.mexc.com'
+# Dữ liệu của MEXC_ORIGIN bị xóa khi trả driver về pool
+_CLEARED_STORAGE_TYPES = 'cookies,local_storage,session_storage,indexeddb,cache_storage'
+# Các token item trong tab pre-market (Selenium dùng CSS, HTTP + lxml dùng XPath tương đương)
+TOKEN_ITEMS_SEL = '#rc-tabs-0-panel-1 ul.ant-list-items li'
+TOKEN_ITEMS_XPATH = '//*[@id="rc-tabs-0-panel-1"]//ul[contains(@class, "ant-list-items")]/li'
+# XPath compile 1 lần lúc import (None nếu không có lxml)
+_token_items_xpath = lxml_etree.XPath(TOKEN_ITEMS_XPATH) if lxml_etree is not None else None
+
+# Crawl order book bằng Selenium: số lần thử tối đa khi lỗi kết nối, và thời gian chờ (giây) trước khi submit lại
+ORDERBOOK_MAX_ATTEMPTS = 2
+ORDERBOOK_RETRY_DELAY = 2
+
+# Các cách tìm link của 1 trang trong pagination
+PAGE_LINK_SEL_TEMPLATES = (
+    ".ant-pagination-item-{page}",
+    "[title='{page}']",
+    "li[title='{page}']",
+    "a[title='{page}']",
+    "button[title='{page}']",
+)
+
+# Thông tin cố định của 1 bảng order book, truyền 1 object cho parse_order_row thay vì từng tham số
+SymbolCtx = namedtuple('SymbolCtx', ['symbol', 'expected_button'])
+
+# innerText của tất cả token item - cùng dạng text nhiều dòng mà extract_token_data parse
+_TOKEN_TEXTS_JS = "return Array.from(document.querySelectorAll(arguments[0]), li => li.innerText);"
+
+# Đợi element khớp selector xuất hiện bằng MutationObserver - trả về false nếu quá timeout (ms)
+_WAIT_FOR_SELECTOR_JS = """
+const selector = arguments[0];
+const timeout = arguments[1];
+const done = arguments[arguments.length - 1];
+if (document.querySelector(selector)) { return done(true); }
+const observer = new MutationObserver(() => {
+    if (document.querySelector(selector)) {
+        observer.disconnect();
+        clearTimeout(timer);
+        done(true);
+    }
+});
+const timer = setTimeout(() => { observer.disconnect(); done(false); }, timeout);
+observer.observe(document.documentElement, {childList: true, subtree: true});
+"""
+
+
+# Snapshot toàn bộ row của 1 bảng order book - dùng chung cho _EXTRACT_ROWS_JS và _PAGINATE_ROWS_JS
+_SNAPSHOT_ROWS_FN = """
+function snapshotRows(tableSel, priceSel, contentSel) {
+    // Bỏ measurement row ngay trong selector - không serialize về Python (is_measurement_row vẫn check style)
+    const rows = document.querySelectorAll(tableSel + ' tbody tr:not(.ant-table-measure-row):not([aria-hidden="true"])');
+    const text = el => el ? el.innerText.trim() : '';
+    return Array.from(rows).map(r => {
+        const cells = r.querySelectorAll('td');
+        const content = td => td ? text(td.querySelector(contentSel) || td) : '';
+        const priceEl = priceSel && cells[0] ? cells[0].querySelector(priceSel) : null;
+        const button = r.querySelector('button');
+        const buttonSpan = button ? button.querySelector('span') : null;
+        return {
+            aria_hidden: r.getAttribute('aria-hidden'),
+            class_name: r.className || '',
+            style: r.style.cssText || '',
+            cell_count: cells.length,
+            price: priceEl ? text(priceEl) : text(cells[0]),
+            quantity: content(cells[1]),
+            total: content(cells[2]),
+            button: button ? text(button) : null,
+            button_span: buttonSpan ? text(buttonSpan) : null
+        };
+    });
+}
+"""
+
+# Lấy toàn bộ row của 1 bảng order book trong 1 lần execute_script (thay vì find_element từng cell)
+_EXTRACT_ROWS_JS = _SNAPSHOT_ROWS_FN + "return snapshotRows(arguments[0], arguments[1], arguments[2]);"
+
+# Trang lớn nhất trong pagination (theo title của các page item): null nếu không có pagination,
+# 0 nếu pagination không có page item nào, còn lại ít nhất là 1
+_MAX_PAGE_JS = """
+const pagSels = arguments[0];
+const itemSel = arguments[1];
+let pag = null;
+for (const s of pagSels) {
+    pag = document.querySelector(s);
+    if (pag) break;
+}
+if (!pag) return null;
+const items = pag.querySelectorAll(itemSel);
+if (!items.length) return 0;
+let max = 1;
+for (const item of items) {
+    const page = parseInt(item.getAttribute('title'), 10);
+    if (page > max) max = page;
+}
+return max;
+"""
+
+# Thời gian tối đa (ms) 1 lần gọi _PAGINATE_ROWS_JS được bắt đầu trang mới - mỗi trang đợi tối đa 8s,
+# tổng vẫn dưới set_script_timeout(30) của driver; trang còn lại xử lý ở lần gọi sau
+PAGINATE_BUDGET_MS = 20000
+
+# Click lần lượt các trang firstPage..lastPage ngay trong browser: mỗi trang đợi pagination active đúng trang
+# (tối đa 5s) rồi đợi row đầu cũ bị gỡ hoặc đổi text (tối đa 3s - bảng có thể dùng lại node row), sau đó snapshot row - cả loop chỉ tốn 1 round trip.
+# Pagination tìm lại mỗi trang nên không bị stale. 2 trang liên tiếp không có row thì dừng sớm (stopped) -
+# emptyStreak truyền qua lại giữa các lần gọi. Trả về {pages: [{page, status, rows}], next: trang chưa xử lý, ...}
+_PAGINATE_ROWS_JS = _SNAPSHOT_ROWS_FN + """
+const [tableSel, priceSel, contentSel, pagSels, activeSel, linkTemplates, itemSel, firstPage, lastPage, budget] = arguments;
+let emptyStreak = arguments[10];
+let stopped = false;
+const done = arguments[arguments.length - 1];
+const start = Date.now();
+const pages = [];
+const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+const findFirst = (root, sels) => {
+    for (const s of sels) {
+        const el = root.querySelector(s);
+        if (el) return el;
+    }
+    return null;
+};
+// Link của trang: thử các selector theo title/class, không có thì tìm page item có text đúng số trang
+const findLink = (pag, page) => {
+    const link = findFirst(pag, linkTemplates.map(t => t.replace('{page}', page)));
+    if (link) return link;
+    for (const item of pag.querySelectorAll(itemSel)) {
+        if (item.textContent.trim() === String(page)) return item;
+    }
+    return null;
+};
+async function waitPage(page, oldRow, oldText) {
+    const pageStart = Date.now();
+    for (;;) {
+        const pag = findFirst(document, pagSels);
+        const active = pag && pag.querySelector(activeSel);
+        if (active && parseInt(active.getAttribute('title'), 10) === page) break;
+        if (Date.now() - pageStart > 5000) return false;
+        await sleep(50);
+    }
+    const rowStart = Date.now();
+    while (oldRow && oldRow.isConnected && oldRow.innerText === oldText && Date.now() - rowStart <= 3000) { await sleep(50); }
+    return true;
+}
+let page = firstPage;
+(async () => {
+    for (; page <= lastPage && (page === firstPage || Date.now() - start < budget); page++) {
+        const pag = findFirst(document, pagSels);
+        const link = pag && findLink(pag, page);
+        if (!link) { pages.push({page, status: 'no_link'}); continue; }
+        const oldRow = document.querySelector(tableSel + ' tbody tr:not(.ant-table-measure-row)');
+        const oldText = oldRow ? oldRow.innerText : null;
+        link.click();
+        if (!(await waitPage(page, oldRow, oldText))) { pages.push({page, status: 'timeout'}); continue; }
+        const rows = snapshotRows(tableSel, priceSel, contentSel);
+        pages.push({page, status: 'ok', rows});
+        emptyStreak = rows.length ? 0 : emptyStreak + 1;
+        if (emptyStreak >= 2) { stopped = true; page++; break; }
+    }
+    done({pages, next: page, empty_streak: emptyStreak, stopped});
+})().catch(e => done({pages, next: page + 1, empty_streak: emptyStreak, stopped, error: String(e)}));
+"""
+
+# Regex dùng trong extract_token_data - compile 1 lần ở module level
+_RE_SYMBOL_CLEAN = re.compile(r'[^A-Za-z0-9]')
+_RE_SPACES = re.compile(r'\s+')
+_RE_CHANGE = re.compile(r'([+-]?\d+\.?\d*)%')
+# Số ngay sau 1 nhãn cố định - dùng với .match(text, pos) sau khi str.find tìm được nhãn
+_RE_NUM = re.compile(r'\s*([\d,]+\.?\d*)')
+_RE_VOLUME_NUM = re.compile(r'\s*([\d,]+\.?\d*[KMB]?)')
+_RE_TIME = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
+_RE_STATUS = re.compile(r'Đợi xác nhận|Đã kết thúc|Đang diễn ra|Đang xác nhận')
+
+# Hệ số cho hậu tố K/M/B của volume
+_SUFFIX = {'K': Decimal(1000), 'M': Decimal(1_000_000), 'B': Decimal(1_000_000_000)}
+
+
+class OrderColumns:
+    """Order book của 1 token dạng cột (SoA) - token_symbol lưu 1 lần thay vì lặp lại trong dict của từng row"""
+    __slots__ = ('token_symbol', 'order_type', 'price', 'quantity', 'total')
+    
+    def __init__(self, token_symbol):
+        self.token_symbol = token_symbol
+        self.order_type = []
+        self.price = []
+        self.quantity = []
+        self.total = []
+    
+    def append(self, order):
+        """Thêm 1 order (dict từ parse_order_row)"""
+        self.order_type.append(order['order_type'])
+        self.price.append(order['price'])
+        self.quantity.append(order['quantity'])
+        self.total.append(order['total'])
+    
+    def extend(self, other):
+        """Nối các cột của OrderColumns khác"""
+        self.order_type.extend(other.order_type)
+        self.price.extend(other.price)
+        self.quantity.extend(other.quantity)
+        self.total.extend(other.total)
+    
+    def rows(self):
+        """Tuple (order_type, price, quantity, total) theo thứ tự cột của order_books"""
+        return zip(self.order_type, self.price, self.quantity, self.total)
+    
+    def __len__(self):
+        return len(self.price)
+    
+    def __iter__(self):
+        # Dạng dict như trước cho các chỗ xuất file
+        for order_type, price, quantity, total in self.rows():
+            yield {'token_symbol': self.token_symbol, 'order_type': order_type,
+                   'price': price, 'quantity': quantity, 'total': total}
+
+
+def _now_str():
+    """Thời điểm hiện tại dạng 'YYYY-MM-DD HH:MM:SS' (format tay, không qua strftime)"""
+    dt = datetime.now()
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d} {dt.hour:02d}:{dt.minute:02d}:{dt.second:02d}"
+
+
+# Cột của file TXT trong save_to_file
+TOKEN_FILE_KEYS = ('name', 'symbol', 'latest_price', 'price_change_percent', 'volume_24h',
+                   'total_volume', 'start_time', 'end_time', 'crawled_at')
+ORDER_FILE_KEYS = ('token_symbol', 'crawled_at', 'order_type', 'price', 'quantity', 'total')
+
+
+def _render_header(total_tokens, total_orders):
+    """Các dòng header của file TXT"""
+    yield "=== MEXC MENTO TOKEN CRAWLER DATA ===\n"
+    yield f"Crawled at: {_now_str()}\n"
+    yield f"Total tokens: {total_tokens}\n"
+    yield f"Total order book entries: {total_orders}\n"
+    yield "=" * 60 + "\n\n"
+
+
+def _render_tokens(tokens):
+    """Section token data - mỗi token 1 dòng tab-separated"""
+    yield "=== TOKEN DATA ===\n"
+    yield "Name\tSymbol\tLatest Price\tPrice Change %\tVolume 24h\tTotal Volume\tStart Time\tEnd Time\tCrawled At\n"
+    for token in tokens:
+        yield '\t'.join(str(token.get(k, '')) for k in TOKEN_FILE_KEYS) + '\n'
+    yield "\n" + "=" * 60 + "\n"
+
+
+def _render_orders(orders):
+    """Section order book - mỗi entry 1 dòng tab-separated"""
+    yield "=== MENTO ORDER BOOK DATA ===\n"
+    yield "Token Symbol\tCrawled At\tOrder Type\tPrice\tQuantity\tTotal\n"
+    for order in orders:
+        yield '\t'.join(str(order.get(k, '')) for k in ORDER_FILE_KEYS) + '\n'
+    yield "\n" + "=" * 60 + "\n"
+
+# Bỏ dấu phân cách hàng nghìn và khoảng trắng trong chuỗi số (str.translate, không cần regex)
+_STRIP_TBL = str.maketrans('', '', ', \t\n\xa0')
+
+
+def _clean_numeric(value):
+    """Convert chuỗi số có dấu phẩy sang Decimal - None nếu rỗng hoặc không parse được"""
+    if not value:
+        return None
+    try:
+        # Decimal thẳng từ chuỗi: không mất chính xác qua float trước khi vào cột DECIMAL(18,8)
+        return Decimal(str(value).translate(_STRIP_TBL))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+
+
+def _number_after(text, label, pattern):
+    """Tìm nhãn bằng str.find rồi match số ngay sau nhãn - trả về chuỗi số (đã bỏ dấu phẩy) hoặc None"""
+    pos = text.find(label)
+    if pos < 0:
+        return None
+    match = pattern.match(text, pos + len(label))
+    return match.group(1).translate(_STRIP_TBL) if match else None
+
+
+def _parse_volume(volume_str):
+    """Convert volume string (có thể có hậu tố K/M/B) sang Decimal"""
+    multiplier = _SUFFIX.get(volume_str[-1:])
+    if multiplier is None:
+        return Decimal(volume_str)
+    return Decimal(volume_str[:-1]) * multiplier
+
+
+# Chrome flags dùng chung cho mọi driver - mỗi flag 1 lần.
+# Chrome chỉ đọc switch --disable-features cuối cùng nên các feature phải gộp vào 1 flag.
+_CHROME_ARGS = (
+    # Basic headless settings
+    '--headless=new',
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    
+    # GPU và rendering optimization
+    '--disable-gpu',
+    '--disable-software-rasterizer',
+    '--disable-gpu-sandbox',
+    '--disable-gpu-process-crash-limit',
+    '--disable-gpu-memory-buffer-video-frames',
+    '--disable-gpu-rasterization',
+    '--disable-gpu-compositing',
+    '--disable-3d-apis',
+    '--disable-webgl',
+    '--disable-webgl2',
+    '--disable-accelerated-2d-canvas',
+    '--disable-accelerated-jpeg-decoding',
+    '--disable-accelerated-mjpeg-decode',
+    '--disable-accelerated-video',
+    '--disable-accelerated-video-decode',
+    '--disable-accelerated-video-encode',
+    
+    # Performance optimization
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-ipc-flooding-protection',
+    '--disable-features=VizDisplayCompositor,TranslateUI,BlinkGenPropertyTrees,EnableDrDc',
+    '--disable-hang-monitor',
+    '--disable-prompt-on-repost',
+    '--disable-domain-reliability',
+    '--disable-client-side-phishing-detection',
+    '--disable-component-update',
+    '--disable-background-downloads',
+    
+    # Memory và resource optimization
+    '--memory-pressure-off',
+    '--disable-background-mode',
+    '--disable-component-extensions-with-background-pages',
+    '--disable-default-apps',
+    '--disable-extensions',
+    '--disable-sync',
+    '--disable-translate',
+    '--disable-plugins',
+    '--disable-images',
+    # Tắt decode/render ảnh trong Blink (kể cả ảnh data: URL mà CDP setBlockedURLs không chặn)
+    '--blink-settings=imagesEnabled=false',
+    
+    # Network optimization
+    '--disable-web-security',
+    '--aggressive-cache-discard',
+    
+    # Logging và debugging
+    '--disable-logging',
+    '--log-level=3',
+    '--silent',
+    '--disable-permissions-api',
+    '--disable-notifications',
+    '--disable-popup-blocking',
+    '--disable-dev-tools',
+    '--disable-devtools',
+    '--no-first-run',
+    '--no-default-browser-check',
+    
+    # Window settings
+    '--window-size=1920,1080',
+    '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    
+    # Anti-detection
+    '--disable-blink-features=AutomationControlled',
+    
+    # Disable WebRTC
+    '--disable-webrtc',
+    '--disable-webrtc-hw-decoding',
+    '--disable-webrtc-hw-encoding',
+    
+    # Disable media
+    '--disable-audio-output',
+    '--disable-audio-input',
+    '--mute-audio',
+)
+
+
+# Request bị chặn trong browser - không cần cho dữ liệu order book/token.
+# Không chặn CSS: element.text (innerText) phụ thuộc layout, Phase 1 tách symbol/name theo dòng.
+_BLOCKED_URLS = (
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.mp3',
+    '*google-analytics*', '*googletagmanager*', '*doubleclick*', '*facebook.net*', '*hotjar*',
+)
+
+# Content settings của profile: 2 = block
+_CHROME_PREFS = {'profile.managed_default_content_settings.images': 2}
+
+# Giới hạn HTTP cache của mỗi driver khi bật chrome_disk_cache_dir (100MB)
+CHROME_DISK_CACHE_SIZE = 100 * 1024 * 1024
+
+# Đường dẫn chromedriver: lấy từ PATH, không có thì Selenium Manager tìm ở driver đầu tiên rồi cache lại
+# để các driver sau không phải chạy Selenium Manager nữa
+_chromedriver_path = shutil.which('chromedriver')
+
+def _make_driver(debugger_address=None, grid_url=None, disk_cache_dir=None):
+    """Tạo Chrome driver với cấu hình dùng chung cho cả Phase 1 và Phase 2
+    
+    debugger_address: 'host:port' của Chrome đang chạy sẵn với --remote-debugging-port - attach vào đó
+    thay vì khởi động Chrome mới (flag dòng lệnh đã cố định lúc launch nên bỏ qua _CHROME_ARGS)
+    grid_url: URL Selenium Grid / Standalone Chrome - tạo session trên node ở đó bằng webdriver.Remote
+    disk_cache_dir: thư mục HTTP cache giữ lại giữa các lần chạy (chỉ khi launch Chrome local)
+    """
+    chrome_options = Options()
+    if debugger_address:
+        chrome_options.add_experimental_option("debuggerAddress", debugger_address)
+    else:
+        for arg in _CHROME_ARGS:
+            chrome_options.add_argument(arg)
+        
+        # Anti-detection
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        
+        # Chặn ảnh ở content settings của profile - không chặn CSS (innerText phụ thuộc layout)
+        chrome_options.add_experimental_option('prefs', _CHROME_PREFS)
+        
+        if disk_cache_dir and not grid_url:
+            chrome_options.add_argument(f'--disk-cache-dir={disk_cache_dir}')
+            chrome_options.add_argument(f'--disk-cache-size={CHROME_DISK_CACHE_SIZE}')
+    
+    # Trả về ngay khi DOMContentLoaded, các bước sau đều tự đợi element cần thiết
+    chrome_options.page_load_strategy = 'eager'
+    
+    global _chromedriver_path
+    if grid_url:
+        driver = webdriver.Remote(command_executor=grid_url, options=chrome_options)
+    else:
+        service = Service(executable_path=_chromedriver_path) if _chromedriver_path else Service()
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        if not _chromedriver_path:
+            _chromedriver_path = getattr(driver.service, 'path', None)
+    # execute_async_script (đợi selector/đổi trang) tự giới hạn thời gian chờ, timeout này chỉ là chốt chặn
+    driver.set_script_timeout(30)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    
+    # Chặn tải ảnh/font/media/analytics qua CDP (--disable-images không chặn hết trong headless mới)
+    # webdriver.Remote không có execute_cdp_cmd - trên Grid chỉ còn chặn ảnh bằng flag/prefs
+    if hasattr(driver, 'execute_cdp_cmd'):
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(_BLOCKED_URLS)})
+    return driver
+
+
+def _clear_site_data(driver):
+    """Xóa cookies, storage và cache của MEXC_ORIGIN - 1 lệnh CDP thay vì 3 round-trip"""
+    if hasattr(driver, 'execute_cdp_cmd'):
+        driver.execute_cdp_cmd('Storage.clearDataForOrigin', {
+            'origin': MEXC_ORIGIN,
+            'storageTypes': _CLEARED_STORAGE_TYPES,
+        })
+    else:
+        driver.delete_all_cookies()
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
 
 
 class MexcPreMarketCrawler:
@@ -39,157 +561,135 @@ class MexcPreMarketCrawler:
         }
         self.conn = None
         self.driver_pool = Queue()
-        self.driver_pool_size = 1  # Chỉ 1 driver để tránh connection issues
+        # Mỗi worker giữ riêng 1 driver trong lúc crawl nên pool size = số worker
+        self.max_workers = max(1, CRAWLER_CONFIG.get('max_workers', 1))
+        self.driver_pool_size = self.max_workers
+        self.orderbook_page_size = CRAWLER_CONFIG.get('orderbook_page_size')
+        # Phase 1: thử đọc danh sách token từ HTML bằng requests trước khi dùng Selenium
+        self.token_list_http = CRAWLER_CONFIG.get('token_list_http', False)
+        # Khoảng cách tối thiểu (giây) giữa 2 lần load trang order book, tính chung cho mọi worker
+        self.request_interval = CRAWLER_CONFIG.get('request_interval', 1)
+        self.request_lock = threading.Lock()
+        self.last_request_time = 0.0
+        # Chrome chạy sẵn (--remote-debugging-port) để attach thay vì khởi động mới, mỗi driver 1 địa chỉ
+        self.debugger_addresses = Queue()
+        for address in CRAWLER_CONFIG.get('chrome_debugger_addresses') or ():
+            self.debugger_addresses.put(address)
+        self.attached_drivers = {}
+        # Selenium Grid / Standalone Chrome - có thì mọi driver là session trên Grid
+        self.selenium_grid_url = CRAWLER_CONFIG.get('selenium_grid_url')
+        # HTTP cache của Chrome giữ lại giữa các lần chạy - 2 Chrome không được dùng chung 1 cache
+        # nên mỗi driver đang chạy giữ 1 slot (thư mục con <chrome_disk_cache_dir>/<slot>)
+        self.disk_cache_dir = CRAWLER_CONFIG.get('chrome_disk_cache_dir')
+        self.disk_cache_slots = Queue()
+        if self.disk_cache_dir:
+            for slot in range(self.driver_pool_size):
+                self.disk_cache_slots.put(slot)
+        self.driver_cache_slots = {}
         self.driver_lock = threading.Lock()
     
     
     def create_driver(self):
-        """Tạo Chrome driver tối ưu - giảm delay và cảnh báo"""
-        chrome_options = Options()
-        
-        # Basic headless settings
-        chrome_options.add_argument('--headless=new')  # Sử dụng headless mới
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        # GPU và rendering optimization
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-gpu-sandbox')
-        chrome_options.add_argument('--disable-gpu-process-crash-limit')
-        chrome_options.add_argument('--disable-gpu-memory-buffer-video-frames')
-        chrome_options.add_argument('--disable-gpu-rasterization')
-        chrome_options.add_argument('--disable-gpu-compositing')
-        chrome_options.add_argument('--disable-3d-apis')
-        chrome_options.add_argument('--disable-webgl')
-        chrome_options.add_argument('--disable-webgl2')
-        chrome_options.add_argument('--disable-accelerated-2d-canvas')
-        chrome_options.add_argument('--disable-accelerated-jpeg-decoding')
-        chrome_options.add_argument('--disable-accelerated-mjpeg-decode')
-        chrome_options.add_argument('--disable-accelerated-video-decode')
-        chrome_options.add_argument('--disable-accelerated-video-encode')
-        
-        # Performance optimization
-        chrome_options.add_argument('--disable-background-networking')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        chrome_options.add_argument('--disable-renderer-backgrounding')
-        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
-        chrome_options.add_argument('--disable-ipc-flooding-protection')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_argument('--disable-features=TranslateUI')
-        chrome_options.add_argument('--disable-features=BlinkGenPropertyTrees')
-        chrome_options.add_argument('--disable-features=EnableDrDc')
+        """Tạo Chrome driver tối ưu - session trên Grid, hoặc attach vào Chrome chạy sẵn nếu còn địa chỉ trống"""
+        if self.selenium_grid_url:
+            return _make_driver(grid_url=self.selenium_grid_url)
         
-        # Memory và resource optimization
-        chrome_options.add_argument('--memory-pressure-off')
-        chrome_options.add_argument('--max_old_space_size=4096')
-        chrome_options.add_argument('--disable-background-mode')
-        chrome_options.add_argument('--disable-component-extensions-with-background-pages')
-        chrome_options.add_argument('--disable-default-apps')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-sync')
-        chrome_options.add_argument('--disable-translate')
-        chrome_options.add_argument('--disable-plugins')
-        chrome_options.add_argument('--disable-images')
-        
-        # Network optimization
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_argument('--aggressive-cache-discard')
-        chrome_options.add_argument('--disable-background-networking')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        
-        # Logging và debugging
-        chrome_options.add_argument('--disable-logging')
-        chrome_options.add_argument('--log-level=3')
-        chrome_options.add_argument('--silent')
-        chrome_options.add_argument('--disable-logging')
-        chrome_options.add_argument('--disable-permissions-api')
-        chrome_options.add_argument('--disable-notifications')
-        chrome_options.add_argument('--disable-popup-blocking')
-        
-        # Window settings
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        
-        # Anti-detection
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Disable DevTools
-        chrome_options.add_argument('--disable-dev-tools')
-        chrome_options.add_argument('--disable-devtools')
-        chrome_options.add_argument('--no-first-run')
-        chrome_options.add_argument('--no-default-browser-check')
-        chrome_options.add_argument('--disable-default-apps')
-        
-        # Disable hardware acceleration completely
-        chrome_options.add_argument('--disable-accelerated-2d-canvas')
-        chrome_options.add_argument('--disable-accelerated-video')
-        chrome_options.add_argument('--disable-accelerated-mjpeg-decode')
-        chrome_options.add_argument('--disable-accelerated-video-decode')
-        chrome_options.add_argument('--disable-accelerated-video-encode')
+        try:
+            address = self.debugger_addresses.get_nowait()
+        except Empty:
+            return self.launch_driver()
         
-        # Disable WebRTC
-        chrome_options.add_argument('--disable-webrtc')
-        chrome_options.add_argument('--disable-webrtc-hw-decoding')
-        chrome_options.add_argument('--disable-webrtc-hw-encoding')
+        try:
+            driver = _make_driver(address)
+        except Exception as e:
+            # Không trả địa chỉ về queue - Chrome ở đó không dùng được, các lần sau tự launch
+            print(f"⚠️ Cannot attach to Chrome at {address}, launching a new one: {e}")
+            return self.launch_driver()
         
-        # Disable media
-        chrome_options.add_argument('--disable-audio-output')
-        chrome_options.add_argument('--disable-audio-input')
-        chrome_options.add_argument('--mute-audio')
+        with self.driver_lock:
+            self.attached_drivers[driver] = address
+        return driver
+    
+    def launch_driver(self):
+        """Khởi động Chrome local - dùng 1 slot disk cache còn trống nếu bật chrome_disk_cache_dir"""
+        try:
+            slot = self.disk_cache_slots.get_nowait()
+        except Empty:
+            return _make_driver()
         
-        # Additional performance flags
-        chrome_options.add_argument('--disable-hang-monitor')
-        chrome_options.add_argument('--disable-prompt-on-repost')
-        chrome_options.add_argument('--disable-domain-reliability')
-        chrome_options.add_argument('--disable-client-side-phishing-detection')
-        chrome_options.add_argument('--disable-component-update')
-        chrome_options.add_argument('--disable-background-downloads')
+        try:
+            driver = _make_driver(disk_cache_dir=os.path.join(self.disk_cache_dir, str(slot)))
+        except Exception:
+            self.disk_cache_slots.put(slot)
+            raise
         
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        with self.driver_lock:
+            self.driver_cache_slots[driver] = slot
         return driver
     
+    def quit_driver(self, driver):
+        """Đóng driver, trả địa chỉ Chrome chạy sẵn / slot disk cache (nếu có) về cho driver sau"""
+        try:
+            driver.quit()
+        finally:
+            with self.driver_lock:
+                address = self.attached_drivers.pop(driver, None)
+                slot = self.driver_cache_slots.pop(driver, None)
+            if address:
+                self.debugger_addresses.put(address)
+            if slot is not None:
+                self.disk_cache_slots.put(slot)
+    
+    def throttle_request(self):
+        """Đợi đủ request_interval kể từ lần load trang trước - chỉ giữ lock trong lúc tính slot"""
+        if not self.request_interval:
+            return
+        with self.request_lock:
+            now = time.monotonic()
+            slot = max(now, self.last_request_time + self.request_interval)
+            self.last_request_time = slot
+        if slot > now:
+            time.sleep(slot - now)
+    
     def get_driver(self):
         """Lấy driver từ pool hoặc tạo mới"""
         with self.driver_lock:
             if not self.driver_pool.empty():
                 return self.driver_pool.get()
-            else:
-                return self.create_driver()
+        # Tạo driver ngoài lock để các worker khởi động Chrome song song
+        return self.create_driver()
     
     def return_driver(self, driver):
         """Trả driver về pool"""
         if driver:
             try:
-                # Clear cookies và cache để tránh conflict
-                driver.delete_all_cookies()
-                driver.execute_script("window.localStorage.clear();")
-                driver.execute_script("window.sessionStorage.clear();")
+                # Clear cookies, storage và cache để tránh conflict
+                _clear_site_data(driver)
                 
                 with self.driver_lock:
-                    if self.driver_pool.qsize() < self.driver_pool_size:
+                    pooled = self.driver_pool.qsize() < self.driver_pool_size
+                    if pooled:
                         self.driver_pool.put(driver)
-                    else:
-                        driver.quit()
-            except:
+                if not pooled:
+                    self.quit_driver(driver)
+            except Exception:
+                # Driver lỗi/chromedriver đã chết (WebDriverException hoặc lỗi kết nối urllib3) - bỏ khỏi pool
                 try:
-                    driver.quit()
-                except:
+                    self.quit_driver(driver)
+                except Exception:
                     pass
     
     def cleanup_driver_pool(self):
         """Dọn dẹp tất cả driver trong pool"""
-        with self.driver_lock:
-            while not self.driver_pool.empty():
-                try:
-                    driver = self.driver_pool.get()
-                    driver.quit()
-                except:
-                    pass
+        while True:
+            with self.driver_lock:
+                if self.driver_pool.empty():
+                    break
+                driver = self.driver_pool.get()
+            try:
+                self.quit_driver(driver)
+            except Exception:
+                pass
     
     def connect_database(self):
         """Kết nối đến PostgreSQL database"""
@@ -202,11 +702,14 @@ class MexcPreMarketCrawler:
             return False
     
     def close_database(self):
-        """Đóng kết nối database và cleanup driver pool"""
+        """Đóng kết nối database, HTTP session và cleanup driver pool"""
         if self.conn:
             self.conn.close()
             print("✅ Database connection closed")
         
+        # Đóng các keep-alive connection của session dùng chung (Phase 1 HTTP)
+        self.session.close()
+        
         # Cleanup driver pool
         self.cleanup_driver_pool()
         print("✅ Driver pool cleaned up")
@@ -249,6 +752,33 @@ class MexcPreMarketCrawler:
                 )
             """)
             
+            # symbol là khóa upsert (ON CONFLICT) - chỉ lần đầu (chưa có unique index) mới phải bỏ các bản trùng cũ
+            cursor.execute("""
+                SELECT 1 FROM pg_indexes
+                WHERE schemaname = current_schema()
+                  AND tablename = 'tokens'
+                  AND indexname = 'tokens_symbol_key'
+            """)
+            if cursor.fetchone() is None:
+                # Giữ bản mới nhất (id lớn nhất) của mỗi symbol - chuyển order_books của các bản cũ sang bản đó
+                # trước khi xóa, nếu không ON DELETE CASCADE sẽ xóa luôn lịch sử order book
+                cursor.execute("""
+                    UPDATE order_books ob SET token_id = k.keep_id
+                    FROM (
+                        SELECT id AS dup_id, max(id) OVER (PARTITION BY symbol) AS keep_id
+                        FROM tokens WHERE symbol IS NOT NULL
+                    ) k
+                    WHERE ob.token_id = k.dup_id AND k.dup_id <> k.keep_id
+                """)
+                moved_count = cursor.rowcount
+                cursor.execute("""
+                    DELETE FROM tokens a USING tokens b
+                    WHERE a.symbol = b.symbol AND a.id < b.id
+                """)
+                print(f"🗑️ Deleted {cursor.rowcount} duplicate tokens before adding unique symbol index "
+                      f"({moved_count} order_books rows moved to the kept token)")
+                cursor.execute("CREATE UNIQUE INDEX tokens_symbol_key ON tokens (symbol)")
+            
             self.conn.commit()
             cursor.close()
             print("✅ Database tables created/verified successfully")
@@ -259,75 +789,68 @@ class MexcPreMarketCrawler:
             self.conn.rollback()
             return False
     
-    def insert_token(self, token_data):
-        """Upsert token vào database (insert or update)"""
+    def upsert_tokens(self, tokens, commit=True):
+        """Upsert tất cả token trong 1 câu INSERT ... ON CONFLICT - trả về dict {symbol: token_id}"""
         if not self.conn:
-            return None
+            return {}
+        
+        # Bỏ token không có symbol, trùng symbol thì lấy bản sau cùng
+        # (ON CONFLICT không update cùng 1 row 2 lần trong 1 câu lệnh)
+        unique_tokens = {token['symbol']: token for token in tokens if token.get('symbol')}
+        if not unique_tokens:
+            return {}
+        
+        def db_value(value):
+            # Field không parse được để '' - lưu NULL thay vì làm hỏng cả batch
+            return None if value == '' else value
+        
+        token_rows = [
+            (
+                token['symbol'],
+                token['name'],
+                db_value(token['latest_price']),
+                db_value(token['price_change_percent']),
+                db_value(token['volume_24h']),
+                db_value(token['total_volume']),
+                token['start_time'],
+                token['end_time'],
+                token['created_at']
+            )
+            for token in unique_tokens.values()
+        ]
         
         try:
             cursor = self.conn.cursor()
             
-            # Check if token already exists by symbol
-            cursor.execute("SELECT id FROM tokens WHERE symbol = %s", (token_data['symbol'],))
-            existing_token = cursor.fetchone()
-            
-            if existing_token:
-                # Update existing token
-                token_id = existing_token[0]
-                cursor.execute("""
-                    UPDATE tokens SET 
-                        name = %s,
-                        latest_price = %s,
-                        price_change_percent = %s,
-                        volume_24h = %s,
-                        total_volume = %s,
-                        start_time = %s,
-                        end_time = %s,
-                        created_at = %s
-                    WHERE id = %s
-                """, (
-                    token_data['name'],
-                    token_data['latest_price'],
-                    token_data['price_change_percent'],
-                    token_data['volume_24h'],
-                    token_data['total_volume'],
-                    token_data['start_time'],
-                    token_data['end_time'],
-                    token_data['created_at'],
-                    token_id
-                ))
-                print(f"✅ Token {token_data['symbol']} updated with ID: {token_id}")
-            else:
-                # Insert new token
-                cursor.execute("""
-                    INSERT INTO tokens (symbol, name, latest_price, price_change_percent, 
-                                      volume_24h, total_volume, start_time, end_time, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    RETURNING id
-                """, (
-                    token_data['symbol'],
-                    token_data['name'],
-                    token_data['latest_price'],
-                    token_data['price_change_percent'],
-                    token_data['volume_24h'],
-                    token_data['total_volume'],
-                    token_data['start_time'],
-                    token_data['end_time'],
-                    token_data['created_at']
-                ))
-                token_id = cursor.fetchone()[0]
-                print(f"✅ Token {token_data['symbol']} inserted with ID: {token_id}")
-            
-            self.conn.commit()
+            rows = execute_values(cursor, """
+                INSERT INTO tokens (symbol, name, latest_price, price_change_percent,
+                                    volume_24h, total_volume, start_time, end_time, created_at)
+                VALUES %s
+                ON CONFLICT (symbol) DO UPDATE SET
+                    name = EXCLUDED.name,
+                    latest_price = EXCLUDED.latest_price,
+                    price_change_percent = EXCLUDED.price_change_percent,
+                    volume_24h = EXCLUDED.volume_24h,
+                    total_volume = EXCLUDED.total_volume,
+                    start_time = EXCLUDED.start_time,
+                    end_time = EXCLUDED.end_time,
+                    created_at = EXCLUDED.created_at
+                RETURNING symbol, id
+            """, token_rows, page_size=1000, fetch=True)
+            
+            if commit:
+                self.conn.commit()
             cursor.close()
-            return token_id
+            token_ids = dict(rows)
+            print(f"✅ Upserted {len(token_ids)} tokens")
+            return token_ids
             
         except psycopg2.Error as e:
-            print(f"❌ Error upserting token: {e}")
+            print(f"❌ Error upserting tokens: {e}")
             self.conn.rollback()
-            return None
+            return {}
     
-    def cleanup_old_tokens(self, current_symbols):
+    def cleanup_old_tokens(self, current_symbols, commit=True):
         """Xóa các tokens không còn trong danh sách hiện tại"""
         if not self.conn or not current_symbols:
             return False
@@ -335,15 +858,16 @@ class MexcPreMarketCrawler:
         try:
             cursor = self.conn.cursor()
             
-            
-            # Convert list to tuple for SQL IN clause
-            symbols_tuple = tuple(current_symbols)
-            
             # Delete tokens that are not in current crawl (including NULL symbols)
+            # Anti-join với mảng symbol (1 tham số text[]) thay vì NOT IN list literal dài
             cursor.execute("""
-                DELETE FROM tokens 
-                WHERE symbol IS NULL OR symbol NOT IN %s
-            """, (symbols_tuple,))
+                DELETE FROM tokens t
+                WHERE t.symbol IS NULL
+                   OR NOT EXISTS (
+                       SELECT 1 FROM unnest(%s::text[]) AS crawled(symbol)
+                       WHERE crawled.symbol = t.symbol
+                   )
+            """, (list(current_symbols),))
             
             deleted_count = cursor.rowcount
             if deleted_count > 0:
@@ -351,7 +875,8 @@ class MexcPreMarketCrawler:
             else:
                 print("ℹ️ No old tokens to delete")
             
-            self.conn.commit()
+            if commit:
+                self.conn.commit()
             cursor.close()
             return True
             
@@ -360,34 +885,45 @@ class MexcPreMarketCrawler:
             self.conn.rollback()
             return False
     
-    def insert_order_books(self, token_id, order_books):
-        """Thêm order books vào database"""
-        if not self.conn or not order_books:
+    def insert_order_books(self, token_orders, commit=True):
+        """Thêm order books của nhiều token trong 1 lần batch insert
+        
+        token_orders: list các cặp (token_id, OrderColumns)
+        """
+        if not self.conn or not token_orders:
             return False
         
         try:
             cursor = self.conn.cursor()
             
-            # Prepare data for batch insert
-            order_data = []
-            for order in order_books:
-                order_data.append((
-                    token_id,
-                    order['order_type'],
-                    order['price'],
-                    order['quantity'],
-                    order['total']
-                ))
-            
-            # Batch insert
-            cursor.executemany("""
-                INSERT INTO order_books (token_id, order_type, price, quantity, total)
-                VALUES (%s, %s, %s, %s, %s)
-            """, order_data)
-            
-            self.conn.commit()
+            # Generator tuple cho batch insert - zip thẳng từ các cột, không tạo list trung gian
+            order_data = (
+                (token_id, *row)
+                for token_id, order_books in token_orders
+                for row in order_books.rows()
+            )
+            total_entries = sum(len(order_books) for _, order_books in token_orders)
+            
+            if total_entries > COPY_THRESHOLD:
+                # Batch lớn: COPY stream CSV, nhanh hơn multi-row INSERT (None -> field rỗng = NULL)
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(order_data)
+                buffer.seek(0)
+                cursor.copy_expert("""
+                    COPY order_books (token_id, order_type, price, quantity, total)
+                    FROM STDIN WITH (FORMAT csv)
+                """, buffer)
+            else:
+                # Batch insert - execute_values tự chia trang khi duyệt generator
+                execute_values(cursor, """
+                    INSERT INTO order_books (token_id, order_type, price, quantity, total)
+                    VALUES %s
+                """, order_data, page_size=1000)
+            
+            if commit:
+                self.conn.commit()
             cursor.close()
-            print(f"✅ Inserted {len(order_books)} order book entries")
+            print(f"✅ Inserted {total_entries} order book entries for {len(token_orders)} tokens")
             return True
             
         except psycopg2.Error as e:
@@ -396,13 +932,20 @@ class MexcPreMarketCrawler:
             return False
     
     def setup_session(self):
-        """Setup session headers"""
+        """Setup session headers và connection pool/retry cho các request HTTP"""
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
             'Accept-Language': 'vi-VN,vi;q=0.9,en;q=0.8',
-            'Accept-Encoding': 'gzip, deflate, br',
+            # Không gửi 'br' - requests chỉ giải nén được brotli khi có cài thêm package brotli
+            'Accept-Encoding': 'gzip, deflate',
         })
+        # Giữ keep-alive connection giữa các request và tự retry lỗi tạm thời
+        # (chỉ Phase 1 dùng session nên giữ kích thước pool mặc định của HTTPAdapter)
+        adapter = HTTPAdapter(
+            max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504))
+        )
+        self.session.mount('https://', adapter)
         self.tokens_data = []
         self.orderbook_data = []
         
@@ -427,6 +970,8 @@ class MexcPreMarketCrawler:
             self.close_database()
             return None, None
         
+        total_order_entries = 0
+        
         try:
             # Phase 1: Get all token data from pre-market page
             phase1_start = time.time()
@@ -455,19 +1000,35 @@ class MexcPreMarketCrawler:
                 print(f"\n💾 Phase 3: Saving to PostgreSQL database...")
                 print(f"🕐 Phase 3 start: {phase3_start_time}")
                 
-                total_order_entries = 0
-                # Insert/Update token data and their order books
-                for token in self.tokens_data:
-                    token_id = self.insert_token(token)
-                    if token_id and token['symbol'] in self.orderbook_data:
-                        # Insert order book data for this specific token
-                        token_orders = self.orderbook_data[token['symbol']]
-                        self.insert_order_books(token_id, token_orders)
-                        total_order_entries += len(token_orders)
+                # Cả Phase 3 là 1 transaction: commit (fsync WAL) 1 lần thay vì sau từng bước,
+                # và cleanup chỉ xóa token cũ khi dữ liệu mới đã ghi thành công
+                # Upsert tất cả token 1 lần, gom order books để insert 1 lần cho tất cả token
+                token_ids = self.upsert_tokens(self.tokens_data, commit=False)
+                token_orders = []
+                for symbol, token_id in token_ids.items():
+                    order_books = self.orderbook_data.get(symbol)
+                    if order_books:
+                        token_orders.append((token_id, order_books))
+                        total_order_entries += len(order_books)
                 
-                # Clean up old tokens not in current crawl
                 current_symbols = [token['symbol'] for token in self.tokens_data if token.get('symbol')]
-                self.cleanup_old_tokens(current_symbols)
+                
+                # Bước nào lỗi đã rollback cả transaction - dừng luôn, không chạy các bước sau
+                saved = (
+                    bool(token_ids)
+                    # Insert order books của tất cả token trong 1 lần
+                    and (not token_orders or self.insert_order_books(token_orders, commit=False))
+                    # Clean up old tokens not in current crawl
+                    and self.cleanup_old_tokens(current_symbols, commit=False)
+                )
+                
+                if saved:
+                    self.conn.commit()
+                    print("✅ Phase 3 transaction committed")
+                else:
+                    self.conn.rollback()
+                    total_order_entries = 0
+                    print("❌ Phase 3 rolled back - database unchanged")
                 
                 phase3_time = time.time() - phase3_start
                 phase3_end_time = datetime.now().strftime("%H:%M:%S")
@@ -487,158 +1048,38 @@ class MexcPreMarketCrawler:
         """Crawl all token data from pre-market page"""
         print(f"\n📋 Phase 1: Getting all token data from pre-market...")
         
-        # Set up Chrome driver - sử dụng cùng cấu hình tối ưu
-        chrome_options = Options()
-        
-        # Basic headless settings
-        chrome_options.add_argument('--headless=new')  # Sử dụng headless mới
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        
-        # GPU và rendering optimization
-        chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--disable-software-rasterizer')
-        chrome_options.add_argument('--disable-gpu-sandbox')
-        chrome_options.add_argument('--disable-gpu-process-crash-limit')
-        chrome_options.add_argument('--disable-gpu-memory-buffer-video-frames')
-        chrome_options.add_argument('--disable-gpu-rasterization')
-        chrome_options.add_argument('--disable-gpu-compositing')
-        chrome_options.add_argument('--disable-3d-apis')
-        chrome_options.add_argument('--disable-webgl')
-        chrome_options.add_argument('--disable-webgl2')
-        chrome_options.add_argument('--disable-accelerated-2d-canvas')
-        chrome_options.add_argument('--disable-accelerated-jpeg-decoding')
-        chrome_options.add_argument('--disable-accelerated-mjpeg-decode')
-        chrome_options.add_argument('--disable-accelerated-video-decode')
-        chrome_options.add_argument('--disable-accelerated-video-encode')
-        
-        # Performance optimization
-        chrome_options.add_argument('--disable-background-networking')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        chrome_options.add_argument('--disable-renderer-backgrounding')
-        chrome_options.add_argument('--disable-backgrounding-occluded-windows')
-        chrome_options.add_argument('--disable-ipc-flooding-protection')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_argument('--disable-features=TranslateUI')
-        chrome_options.add_argument('--disable-features=BlinkGenPropertyTrees')
-        chrome_options.add_argument('--disable-features=EnableDrDc')
-        
-        # Memory và resource optimization
-        chrome_options.add_argument('--memory-pressure-off')
-        chrome_options.add_argument('--max_old_space_size=4096')
-        chrome_options.add_argument('--disable-background-mode')
-        chrome_options.add_argument('--disable-component-extensions-with-background-pages')
-        chrome_options.add_argument('--disable-default-apps')
-        chrome_options.add_argument('--disable-extensions')
-        chrome_options.add_argument('--disable-sync')
-        chrome_options.add_argument('--disable-translate')
-        chrome_options.add_argument('--disable-plugins')
-        chrome_options.add_argument('--disable-images')
-        
-        # Network optimization
-        chrome_options.add_argument('--disable-web-security')
-        chrome_options.add_argument('--disable-features=VizDisplayCompositor')
-        chrome_options.add_argument('--aggressive-cache-discard')
-        chrome_options.add_argument('--disable-background-networking')
-        chrome_options.add_argument('--disable-background-timer-throttling')
-        
-        # Logging và debugging
-        chrome_options.add_argument('--disable-logging')
-        chrome_options.add_argument('--log-level=3')
-        chrome_options.add_argument('--silent')
-        chrome_options.add_argument('--disable-logging')
-        chrome_options.add_argument('--disable-permissions-api')
-        chrome_options.add_argument('--disable-notifications')
-        chrome_options.add_argument('--disable-popup-blocking')
-        
-        # Window settings
-        chrome_options.add_argument('--window-size=1920,1080')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-        
-        # Anti-detection
-        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Disable DevTools
-        chrome_options.add_argument('--disable-dev-tools')
-        chrome_options.add_argument('--disable-devtools')
-        chrome_options.add_argument('--no-first-run')
-        chrome_options.add_argument('--no-default-browser-check')
-        chrome_options.add_argument('--disable-default-apps')
-        
-        # Disable hardware acceleration completely
-        chrome_options.add_argument('--disable-accelerated-2d-canvas')
-        chrome_options.add_argument('--disable-accelerated-video')
-        chrome_options.add_argument('--disable-accelerated-mjpeg-decode')
-        chrome_options.add_argument('--disable-accelerated-video-decode')
-        chrome_options.add_argument('--disable-accelerated-video-encode')
-        
-        # Disable WebRTC
-        chrome_options.add_argument('--disable-webrtc')
-        chrome_options.add_argument('--disable-webrtc-hw-decoding')
-        chrome_options.add_argument('--disable-webrtc-hw-encoding')
-        
-        # Disable media
-        chrome_options.add_argument('--disable-audio-output')
-        chrome_options.add_argument('--disable-audio-input')
-        chrome_options.add_argument('--mute-audio')
-        
-        # Additional performance flags
-        chrome_options.add_argument('--disable-hang-monitor')
-        chrome_options.add_argument('--disable-prompt-on-repost')
-        chrome_options.add_argument('--disable-domain-reliability')
-        chrome_options.add_argument('--disable-client-side-phishing-detection')
-        chrome_options.add_argument('--disable-component-update')
-        chrome_options.add_argument('--disable-background-downloads')
+        # Thử lấy danh sách token từ HTML server render trước - không cần mở browser
+        if self.token_list_http:
+            token_texts = self.fetch_token_texts_http()
+            if token_texts:
+                print(f"📊 Found {len(token_texts)} token items via HTTP")
+                self.process_token_texts(token_texts)
+                return
+            print("ℹ️ Token list not in server HTML, falling back to Selenium")
         
         driver = None
         try:
-            driver = webdriver.Chrome(options=chrome_options)
-            url = 'https://www.mexc.com/vi-VN/pre-market'
+            # Lấy driver từ pool để Phase 2 dùng lại cùng browser process
+            driver = self.get_driver()
+            url = PREMARKET_URL
             print(f"📡 Loading URL: {url}")
             
             driver.get(url)
             
-            # Wait for page to load
-            wait = WebDriverWait(driver, 20)
-            
-            # Wait for the specific tab panel
+            # Wait for token items - MutationObserver trong browser báo ngay khi list được render
             try:
-                print("⏳ Waiting for token panel to load...")
-                tab_panel = wait.until(
-                    EC.presence_of_element_located((By.ID, "rc-tabs-0-panel-1"))
-                )
-                
-                # Smart wait for token list to be populated instead of fixed sleep
                 print("⏳ Waiting for token list to load...")
-                token_list = wait.until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "ul.ant-list-items"))
-                )
+                if not self.wait_for_selector(driver, TOKEN_ITEMS_SEL, 20):
+                    raise TimeoutException("token list not rendered")
                 
-                # Wait for actual token items to be present
-                wait.until(lambda driver: len(driver.find_elements(By.CSS_SELECTOR, "ul.ant-list-items li")) > 0)
+                # Lấy text của tất cả token item trong 1 round trip thay vì gọi .text cho từng element
+                token_texts = driver.execute_script(_TOKEN_TEXTS_JS, TOKEN_ITEMS_SEL) or []
                 
-                if token_list:
+                if token_texts:
                     print("✅ Found token list, processing all tokens...")
-                    token_items = token_list.find_elements(By.TAG_NAME, "li")
-                    
-                    print(f"📊 Found {len(token_items)} token items")
-                    
-                    for i, item in enumerate(token_items):
-                        try:
-                            # Extract token data for all tokens
-                            token_data = self.extract_token_data(item)
-                            if token_data:
-                                self.tokens_data.append(token_data)
-                                symbol = token_data.get('symbol', '')
-                                print(f"✅ Token {i+1}: {symbol} extracted")
-                            
-                        except Exception as e:
-                            print(f"❌ Error processing token {i+1}: {e}")
-                            continue
+                    print(f"📊 Found {len(token_texts)} token items")
                     
-                    print(f"✅ Successfully extracted {len(self.tokens_data)} tokens")
+                    self.process_token_texts(token_texts)
                 
             except TimeoutException:
                 print("⚠️ Timeout waiting for token list. No tokens extracted.")
@@ -647,8 +1088,56 @@ class MexcPreMarketCrawler:
             print(f"❌ Error in token data crawling: {e}")
             
         finally:
+            # Trả driver về pool thay vì quit - Phase 2 sẽ dùng lại
             if driver:
-                driver.quit()
+                self.return_driver(driver)
+    
+    def process_token_texts(self, token_texts):
+        """Parse text của từng token item và thêm vào self.tokens_data"""
+        # Tất cả token trong 1 lần crawl dùng chung 1 timestamp
+        now_str = _now_str()
+        for i, item_text in enumerate(token_texts):
+            try:
+                # Extract token data for all tokens
+                token_data = self.extract_token_data(item_text, now_str=now_str)
+                if token_data:
+                    self.tokens_data.append(token_data)
+                    symbol = token_data.get('symbol', '')
+                    log.debug("✅ Token %d: %s extracted", i + 1, symbol)
+                
+            except Exception as e:
+                print(f"❌ Error processing token {i+1}: {e}")
+                continue
+        
+        print(f"✅ Successfully extracted {len(self.tokens_data)} tokens")
+    
+    def fetch_token_texts_http(self):
+        """Lấy text các token item từ HTML của trang pre-market bằng requests + lxml
+        
+        Trả về list rỗng nếu không có lxml, request lỗi hoặc danh sách token chỉ render bằng JS.
+        """
+        if lxml_html is None:
+            return []
+        
+        try:
+            response = self.session.get(PREMARKET_URL, timeout=15)
+            response.raise_for_status()
+            tree = lxml_html.fromstring(response.content)
+        except (requests.RequestException, ValueError) as e:
+            print(f"⚠️ Error fetching pre-market HTML: {e}")
+            return []
+        
+        token_texts = []
+        for item in _token_items_xpath(tree):
+            # Mỗi text node 1 dòng - gần với element.text của Selenium
+            lines = [text.strip() for text in item.itertext() if text.strip()]
+            if lines:
+                token_texts.append('\n'.join(lines))
+        
+        # Chỉ tin HTML khi thật sự có dữ liệu giá (không phải skeleton/placeholder)
+        if not any('Giá giao dịch mới nhất' in text for text in token_texts):
+            return []
+        return token_texts
     
     def crawl_all_orderbooks(self):
         """Crawl order books for all tokens using parallel processing"""
@@ -664,185 +1153,208 @@ class MexcPreMarketCrawler:
         
         print(f"🚀 Starting parallel order book crawling for {len(valid_tokens)} tokens...")
         
-        # Use ThreadPoolExecutor for parallel processing
-        max_workers = 1  # Chỉ 1 worker để tránh connection issues  # Tối đa 3 threads để tránh quá tải
+        # Use ThreadPoolExecutor for parallel processing - mỗi thread lấy driver riêng từ pool,
+        # không có WebDriver session nào bị dùng chung giữa các thread
+        max_workers = min(self.max_workers, len(valid_tokens))
+        print(f"🧵 Using {max_workers} workers")
+        
+        def crawl_timed(token, attempt=1):
+            # Đo thời gian ngay trong worker - tính từ lúc submit sẽ cộng cả thời gian token đợi worker rảnh
+            start = time.monotonic()
+            return self.crawl_token_orderbook(token, attempt), time.monotonic() - start
         
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Submit all tasks
-            future_to_symbol = {
-                executor.submit(self.crawl_token_orderbook_optimized, token): token.get('symbol', '')
+            future_to_token = {
+                executor.submit(crawl_timed, token): (token, 1)
                 for token in valid_tokens
             }
+            # Token lỗi kết nối: (thời điểm được retry, token, lần thử) - due tăng dần nên deque luôn đúng thứ tự
+            retry_queue = deque()
             
             # Process completed tasks
             completed = 0
-            for future in as_completed(future_to_symbol):
-                symbol = future_to_symbol[future]
-                completed += 1
-                token_start_time = time.time()
+            while future_to_token or retry_queue:
+                # Submit lại các token đã tới hạn retry - worker không phải ngồi sleep chờ backoff
+                now = time.monotonic()
+                while retry_queue and retry_queue[0][0] <= now:
+                    _, token, attempt = retry_queue.popleft()
+                    future_to_token[executor.submit(crawl_timed, token, attempt)] = (token, attempt)
                 
-                try:
-                    token_orders = future.result()
-                    token_time = time.time() - token_start_time
+                timeout = retry_queue[0][0] - now if retry_queue else None
+                if not future_to_token:
+                    time.sleep(timeout)
+                    continue
+                
+                done, _ = wait(future_to_token, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    token, attempt = future_to_token.pop(future)
+                    symbol = token['symbol']
+                    
+                    try:
+                        token_orders, token_time = future.result()
+                    except Exception as e:
+                        completed += 1
+                        print(f"❌ [{completed}/{len(valid_tokens)}] {symbol}: Error - {e}")
+                        continue
+                    
+                    if token_orders is None:
+                        if attempt < ORDERBOOK_MAX_ATTEMPTS:
+                            retry_queue.append((time.monotonic() + ORDERBOOK_RETRY_DELAY, token, attempt + 1))
+                            continue
+                        print(f"❌ [{symbol}] Max retries reached, giving up")
+                    
+                    completed += 1
                     if token_orders:
                         self.orderbook_data[symbol] = token_orders
                         print(f"✅ [{completed}/{len(valid_tokens)}] {symbol}: {len(token_orders)} order entries ({token_time:.1f}s)")
                     else:
                         print(f"⚠️ [{completed}/{len(valid_tokens)}] {symbol}: No order book data found ({token_time:.1f}s)")
-                except Exception as e:
-                    token_time = time.time() - token_start_time
-                    print(f"❌ [{completed}/{len(valid_tokens)}] {symbol}: Error - {e} ({token_time:.1f}s)")
-                
-                # Add delay between requests to avoid overwhelming the server
-                time.sleep(1)
         
         print(f"🎯 Parallel crawling completed! Processed {len(self.orderbook_data)} tokens successfully")
     
-    def crawl_token_orderbook_optimized(self, token):
-        """Crawl order book for a specific token using driver pool"""
+    def orderbook_url(self, symbol):
+        """URL trang order book - thêm pageSize để bảng trả nhiều row/trang (site bỏ qua thì vẫn paginate như cũ)"""
+        url = f'{PREMARKET_URL}/{symbol}'
+        if self.orderbook_page_size:
+            url += f'?pageSize={self.orderbook_page_size}'
+        return url
+    
+    def crawl_token_orderbook(self, token, attempt=1):
+        """Crawl order book for a specific token using driver pool - 1 lần thử, trả về None nếu lỗi kết nối (caller retry sau)"""
         symbol = token.get('symbol', '')
         if not symbol:
             return []
         
         driver = None
-        max_retries = 2
-        
-        for attempt in range(max_retries):
-            try:
-                # Get driver from pool
-                driver = self.get_driver()
+        try:
+            # Get driver from pool
+            driver = self.get_driver()
+            
+            # Use correct URL pattern for the token
+            url = self.orderbook_url(symbol)
+            log.debug("  🔗 [%s] Loading URL: %s (attempt %d)", symbol, url, attempt)
+            
+            # Giãn cách lúc gửi request (nếu có cấu hình) thay vì sleep sau mỗi token hoàn thành
+            self.throttle_request()
+            driver.get(url)
+            
+            # Wait for data - trả về ngay khi bảng SELL/BUY có row dữ liệu thay vì sleep cố định
+            # (khung bảng render trước khi request data trả về; order book rỗng thật thì đợi tối đa 15s)
+            if not self.wait_for_selector(driver, ORDERBOOK_ROWS_SEL, 15):
+                print(f"  ⚠️ [{symbol}] No order book rows after 15s")
+            
+            # Check if page loaded successfully
+            if "404" not in driver.title and "error" not in driver.title.lower():
+                log.debug("  ✅ [%s] Successfully loaded order book page", symbol)
                 
-                # Use correct URL pattern for the token
-                url = f'https://www.mexc.com/vi-VN/pre-market/{symbol}'
-                print(f"  🔗 [{symbol}] Loading URL: {url} (attempt {attempt + 1})")
+                # Extract order book data for this token
+                orderbook_entries = self.extract_orderbook(driver, symbol)
                 
-                driver.get(url)
+                if orderbook_entries:
+                    log.debug("  📊 [%s] Found %d order book entries", symbol, len(orderbook_entries))
+                else:
+                    print(f"  ⚠️ [{symbol}] No order book data found")
                 
-                # Wait for page to load
-                wait = WebDriverWait(driver, 15)
-                time.sleep(3)  # Simple wait
+                return orderbook_entries
+            else:
+                print(f"  ❌ [{symbol}] Page not found: {url}")
+                return []
                 
-                # Check if page loaded successfully
-                if "404" not in driver.title and "error" not in driver.title.lower():
-                    print(f"  ✅ [{symbol}] Successfully loaded order book page")
-                    
-                    # Extract order book data for this token
-                    orderbook_entries = self.extract_orderbook_optimized(driver, symbol)
-                    
-                    if orderbook_entries:
-                        print(f"  📊 [{symbol}] Found {len(orderbook_entries)} order book entries")
-                    else:
-                        print(f"  ⚠️ [{symbol}] No order book data found")
-                    
-                    return orderbook_entries
-                else:
-                    print(f"  ❌ [{symbol}] Page not found: {url}")
-                    return []
-                    
-            except Exception as e:
-                error_msg = str(e)
-                if "Connection aborted" in error_msg or "ConnectionResetError" in error_msg:
-                    print(f"  ⚠️ [{symbol}] Connection error (attempt {attempt + 1}): {error_msg}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2)  # Wait before retry
-                        continue
-                    else:
-                        print(f"❌ [{symbol}] Max retries reached, giving up")
-                        return []
-                else:
-                    print(f"❌ [{symbol}] Error crawling order book: {e}")
-                    return []
-            finally:
-                # Return driver to pool
-                if driver:
-                    self.return_driver(driver)
-                    driver = None
+        except Exception as e:
+            error_msg = str(e)
+            if "Connection aborted" in error_msg or "ConnectionResetError" in error_msg:
+                print(f"  ⚠️ [{symbol}] Connection error (attempt {attempt}): {error_msg}")
+                return None
+            print(f"❌ [{symbol}] Error crawling order book: {e}")
+            return []
+        finally:
+            # Return driver to pool
+            if driver:
+                self.return_driver(driver)
     
-    def extract_orderbook_optimized(self, driver, symbol):
-        """Extract order book data for any token - optimized version"""
-        orderbook_entries = []
-        crawled_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    def extract_orderbook(self, driver, symbol):
+        """Extract order book data for any token"""
+        orderbook_entries = OrderColumns(symbol)
         
         try:
-            print(f"    🔍 [{symbol}] Extracting order book data...")
+            log.debug("    🔍 [%s] Extracting order book data...", symbol)
             
+            # Cả 2 bảng ghi thẳng vào orderbook_entries qua sink - không tạo OrderColumns riêng rồi extend
             # Phase 1: Crawl SELL orders (lệnh bán) - table with "Mua" buttons
-            print(f"    🔍 [{symbol}] Phase 1: Crawling SELL orders...")
-            sell_entries = self.crawl_order_type_optimized(driver, symbol, crawled_at,
-                                                         table_selector=".order-book-table_sellTable__Dxd2s",
-                                                         price_selector=".order-book-table_sellPrice__xAuZe",
-                                                         expected_button="Mua",
-                                                         order_type_name="SELL orders")
-            orderbook_entries.extend(sell_entries)
+            log.debug("    🔍 [%s] Phase 1: Crawling SELL orders...", symbol)
+            sell_count = self.crawl_order_type(driver, symbol,
+                                               table_selector=SELL_TABLE_SEL,
+                                               price_selector=SELL_PRICE_SEL,
+                                               expected_button="Mua",
+                                               order_type_name="SELL orders",
+                                               sink=orderbook_entries.append)
             
             # Phase 2: Crawl BUY orders (lệnh mua) - table with "Bán" buttons  
-            print(f"    🔍 [{symbol}] Phase 2: Crawling BUY orders...")
-            buy_entries = self.crawl_order_type_optimized(driver, symbol, crawled_at,
-                                                        table_selector=".order-book-table_buyTable__xqBVW", 
-                                                        price_selector=".order-book-table_buyPrice__uY0OB",
-                                                        expected_button="Bán",
-                                                        order_type_name="BUY orders")
-            orderbook_entries.extend(buy_entries)
+            log.debug("    🔍 [%s] Phase 2: Crawling BUY orders...", symbol)
+            buy_count = self.crawl_order_type(driver, symbol,
+                                              table_selector=BUY_TABLE_SEL,
+                                              price_selector=BUY_PRICE_SEL,
+                                              expected_button="Bán",
+                                              order_type_name="BUY orders",
+                                              sink=orderbook_entries.append)
             
-            print(f"    ✅ [{symbol}] Total extracted: {len(orderbook_entries)} entries ({len(sell_entries)} SELL + {len(buy_entries)} BUY)")
+            log.debug("    ✅ [%s] Total extracted: %d entries (%d SELL + %d BUY)", symbol, len(orderbook_entries), sell_count, buy_count)
             
         except Exception as e:
             print(f"    ❌ [{symbol}] Error extracting order book: {str(e)}")
         
         return orderbook_entries
     
-    def crawl_order_type_optimized(self, driver, symbol, crawled_at, table_selector, price_selector, expected_button, order_type_name):
-        """Crawl specific order type (SELL or BUY orders) - optimized version"""
-        orderbook_entries = []
+    def crawl_order_type(self, driver, symbol, table_selector, price_selector, expected_button, order_type_name, *, sink):
+        """Crawl specific order type (SELL or BUY orders) - đẩy từng entry vào sink, trả về số entry"""
+        valid_entries = 0
+        ctx = SymbolCtx(symbol, expected_button)
         
         try:
             # Quick check for table data
             try:
                 table = driver.find_element(By.CSS_SELECTOR, table_selector)
                 table_ready = True
-            except:
+            except NoSuchElementException:
                 table_ready = False
             
             if table_ready:
                 if not table:
                     print(f"      ⚠️ [{symbol}] Table not found with selector: {table_selector}")
-                    return orderbook_entries
+                    return valid_entries
                 
-                print(f"      ✅ [{symbol}] Found {order_type_name} table")
+                log.debug("      ✅ [%s] Found %s table", symbol, order_type_name)
                 
-                # Extract rows from this table with stale element handling
-                rows = table.find_elements(By.CSS_SELECTOR, "tr")
+                # Extract rows from this table in one round trip
+                rows = self.extract_rows(driver, table_selector, price_selector)
                 if not rows:
                     print(f"      ⚠️ [{symbol}] No rows found in table")
-                    return orderbook_entries
+                    return valid_entries
                 
                 # Parse each row quickly
-                valid_entries = 0
                 for i, row in enumerate(rows):
                     try:
-                        # Skip measurement rows
-                        if self.is_measurement_row(row):
-                            continue
-                        
-                        # Extract order data from row
-                        order_data = self.parse_order_row(row, symbol, price_selector, expected_button)
+                        # Extract order data from row (parse_order_row bỏ qua measurement rows)
+                        order_data = self.parse_order_row(row, ctx)
                         if order_data:
-                            orderbook_entries.append(order_data)
+                            sink(order_data)
                             valid_entries += 1
                                 
                     except Exception as e:
                         # Skip error rows silently to avoid spam
                         continue
                 
-                print(f"      📊 [{symbol}] Successfully parsed {valid_entries} entries from {order_type_name}")
+                log.debug("      📊 [%s] Successfully parsed %d entries from %s", symbol, valid_entries, order_type_name)
                 
-                # Handle pagination for this table - optimized (only if needed)
+                # Handle pagination for this table (only if needed)
                 if valid_entries > 0:  # Only check pagination if we have data
-                    pagination_entries = self.handle_pagination_optimized(driver, symbol, crawled_at, table_selector, price_selector, expected_button, order_type_name)
-                    orderbook_entries.extend(pagination_entries)
+                    pagination_count = self.handle_pagination(driver, symbol, table_selector, price_selector, expected_button, order_type_name,
+                                                              sink=sink)
                     
-                    if pagination_entries:
-                        print(f"      📊 [{symbol}] Found {len(pagination_entries)} additional entries from {order_type_name} pagination")
+                    if pagination_count:
+                        valid_entries += pagination_count
+                        log.debug("      📊 [%s] Found %d additional entries from %s pagination", symbol, pagination_count, order_type_name)
                 
             else:
                 print(f"      ⚠️ [{symbol}] {order_type_name} table not found")
@@ -852,663 +1364,174 @@ class MexcPreMarketCrawler:
         except Exception as e:
             print(f"      ❌ [{symbol}] Error with {order_type_name} table: {e}")
         
-        return orderbook_entries
+        return valid_entries
     
-    def handle_pagination_optimized(self, driver, symbol, crawled_at, table_selector, price_selector=None, expected_button=None, order_type_name=""):
-        """Handle pagination - optimized version with reduced wait times"""
-        pagination_entries = []
+    def handle_pagination(self, driver, symbol, table_selector, price_selector=None, expected_button=None, order_type_name="", *, sink):
+        """Handle pagination - đẩy từng entry vào sink (vd list.append của caller), trả về số entry"""
+        pagination_count = 0
+        ctx = SymbolCtx(symbol, expected_button)
         
         try:
             # Look for pagination - use specific selector based on order type
-            if "sellTable" in table_selector:
-                pagination_selectors = [
-                    ".order-book-table_paginationWrapper__O_FJg:first-of-type",
-                    ".order-book-table_sellTable__Dxd2s + .order-book-table_paginationWrapper__O_FJg",
-                    ".ant-pagination",
-                    "[class*='pagination']"
-                ]
-            elif "buyTable" in table_selector:
-                pagination_selectors = [
-                    ".order-book-table_buyTable__xqBVW .order-book-table_paginationWrapper__O_FJg",
-                    ".order-book-table_buyTable__xqBVW + .order-book-table_paginationWrapper__O_FJg",
-                    ".order-book-table_paginationWrapper__O_FJg:last-of-type",
-                    ".ant-pagination",
-                    "[class*='pagination']"
-                ]
-            else:
-                pagination_selectors = [
-                    ".order-book-table_paginationWrapper__O_FJg",
-                    ".ant-pagination",
-                    "[class*='pagination']"
-                ]
+            pagination_selectors = _pagination_selectors(table_selector)
             
-            # Quick check for pagination
-            pagination = None
-            for selector in pagination_selectors:
-                try:
-                    pagination = driver.find_element(By.CSS_SELECTOR, selector)
-                    if pagination:
-                        break
-                except:
-                    continue
+            # Tìm pagination và trang lớn nhất trong 1 round trip (chỉ crawl các trang thực sự có)
+            max_page = driver.execute_script(_MAX_PAGE_JS, list(pagination_selectors), PAGINATION_ITEM_SEL)
             
-            if not pagination:
-                return pagination_entries
+            if max_page is None:
+                return pagination_count
             
-            # Get page numbers
-            page_items = pagination.find_elements(By.CSS_SELECTOR, ".ant-pagination-item")
-            if not page_items:
+            if not max_page:
                 print(f"      ℹ️ [{symbol}] No page items found")
-                return pagination_entries
+                return pagination_count
             
-            # Get available page numbers (only crawl pages that actually exist)
-            available_pages = []
-            for item in page_items:
-                try:
-                    page_num = int(item.get_attribute('title'))
-                    available_pages.append(page_num)
-                except:
-                    continue
-            
-            # Sort and get max page
-            available_pages.sort()
-            max_page = max(available_pages) if available_pages else 1
-            
-            print(f"      📄 [{symbol}] Processing pages 1 to {max_page} for {order_type_name}")
+            log.debug("      📄 [%s] Processing pages 1 to %d for %s", symbol, max_page, order_type_name)
             
-            # Process pages from 2 to max_page - optimized with shorter waits
+            # Process pages from 2 to max_page - click/đợi/lấy row chạy trong browser, mỗi lần gọi xử lý nhiều trang
             if max_page > 1:
-                pages_to_process = list(range(2, max_page + 1))
-                
-                for page_num in pages_to_process:
+                next_page = 2
+                last_page = max_page
+                empty_streak = 0
+                while next_page <= max_page:
                     try:
-                        print(f"      🔄 [{symbol}] Processing page {page_num}...")
+                        result = driver.execute_async_script(
+                            _PAGINATE_ROWS_JS, table_selector, price_selector, CELL_CONTENT_SEL,
+                            list(pagination_selectors), PAGINATION_ACTIVE_SEL, list(PAGE_LINK_SEL_TEMPLATES),
+                            PAGINATION_ITEM_SEL, next_page, max_page, PAGINATE_BUDGET_MS, empty_streak
+                        )
+                    except TimeoutException:
+                        print(f"      ❌ [{symbol}] Pagination script timed out at page {next_page}")
+                        break
+                    
+                    for page in result['pages']:
+                        page_num = page['page']
+                        if page['status'] == 'no_link':
+                            print(f"      ❌ [{symbol}] Page {page_num} link not found")
+                            continue
+                        if page['status'] == 'timeout':
+                            # Chưa đổi trang thì bỏ qua để tránh lấy trùng data
+                            print(f"        ⚠️ [{symbol}] Page {page_num} not confirmed, skipping")
+                            continue
                         
-                        # Find and click page link
-                        page_link = None
-                        page_selectors = [
-                            f".ant-pagination-item-{page_num}",
-                            f"[title='{page_num}']",
-                            f"li[title='{page_num}']",
-                            f"a[title='{page_num}']",
-                            f"button[title='{page_num}']"
-                        ]
+                        rows = page['rows']
+                        if not rows:
+                            print(f"        ⚠️ [{symbol}] No rows found on page {page_num}")
+                            continue
                         
-                        for selector in page_selectors:
+                        page_count = 0
+                        for row in rows:
                             try:
-                                page_link = pagination.find_element(By.CSS_SELECTOR, selector)
-                                break
-                            except NoSuchElementException:
+                                order_data = self.parse_order_row(row, ctx)
+                                if order_data:
+                                    sink(order_data)
+                                    page_count += 1
+                            except Exception as e:
+                                log.debug("          ⚠️ [%s] Error parsing row on page %d: %s", symbol, page_num, e)
                                 continue
                         
-                        if page_link:
-                            # Click page link
-                            driver.execute_script("arguments[0].click();", page_link)
-                            print(f"        ✅ [{symbol}] Clicked page {page_num}")
-                            
-                            # Smart wait for page change instead of fixed sleep
-                            # Wait for page change
-                            time.sleep(2)  # Simple wait
-                            page_changed = True
-                            if not page_changed:
-                                print(f"        ⚠️ [{symbol}] Page change verification failed, continuing...")
-                            
-                            # Extract data from current page with stale element handling
-                            try:
-                                # Re-find table after page change to avoid stale elements
-                                table = driver.find_element(By.CSS_SELECTOR, table_selector)
-                                if not table:
-                                    print(f"        ⚠️ [{symbol}] Table not found on page {page_num}")
-                                    continue
-                                
-                                rows = table.find_elements(By.CSS_SELECTOR, "tr")
-                                if not rows:
-                                    print(f"        ⚠️ [{symbol}] No rows found on page {page_num}")
-                                    continue
-                                
-                                page_entries = []
-                                page_crawled_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                
-                                for row in rows:
-                                    try:
-                                        if not self.is_measurement_row(row):
-                                            order_data = self.parse_order_row(row, symbol, price_selector, expected_button)
-                                            if order_data:
-                                                page_entries.append(order_data)
-                                    except Exception as e:
-                                        print(f"          ⚠️ [{symbol}] Error parsing row on page {page_num}: {str(e)}")
-                                        continue
-                                
-                                pagination_entries.extend(page_entries)
-                                print(f"        📄 [{symbol}] Page {page_num}: {len(page_entries)} entries")
-                                
-                            except Exception as e:
-                                print(f"        ❌ [{symbol}] Error extracting page {page_num}: {str(e)}")
-                        else:
-                            print(f"      ❌ [{symbol}] Page {page_num} link not found")
-                            
-                    except Exception as e:
-                        print(f"      ❌ [{symbol}] Error processing page {page_num}: {e}")
-                        continue
+                        pagination_count += page_count
+                        log.debug("        📄 [%s] Page %d: %d entries", symbol, page_num, page_count)
+                    
+                    if result.get('error'):
+                        print(f"      ❌ [{symbol}] Error processing page {result['next'] - 1}: {result['error']}")
+                    if result['stopped']:
+                        # Trang rỗng liên tiếp thường là đã hết dữ liệu - không đi tiếp tới max_page
+                        last_page = result['next'] - 1
+                        print(f"      ℹ️ [{symbol}] {order_type_name}: 2 empty pages in a row, stopping at page {last_page}/{max_page}")
+                        break
+                    # Script luôn xử lý ít nhất 1 trang - chốt chặn để không loop vô hạn
+                    if result['next'] <= next_page:
+                        break
+                    empty_streak = result['empty_streak']
+                    next_page = result['next']
                 
-                print(f"      ✅ [{symbol}] Completed pagination for {order_type_name}: {len(pagination_entries)} additional entries from {max_page-1} pages")
+                log.debug("      ✅ [%s] Completed pagination for %s: %d additional entries from %d pages", symbol, order_type_name, pagination_count, last_page - 1)
             else:
-                print(f"      ℹ️ [{symbol}] Only 1 page available for {order_type_name}, no pagination needed")
+                log.debug("      ℹ️ [%s] Only 1 page available for %s, no pagination needed", symbol, order_type_name)
                 
         except Exception as e:
             print(f"      ❌ [{symbol}] Error handling pagination: {e}")
         
-        return pagination_entries
-    
-    
+        return pagination_count
     
-    
-    
-    
-    
-    
-    
-    def crawl_token_orderbook(self, symbol):
-        """Crawl order book for a specific token"""
-        
+    def wait_for_selector(self, driver, selector, timeout):
+        """Đợi tới khi có element khớp selector (MutationObserver, 1 round trip) - False nếu hết timeout"""
         try:
-            # Use correct URL pattern for the token
-            orderbook_entries = self.crawl_orderbook_for_token(symbol)
-            
-            if not orderbook_entries:
-                print(f"⚠️  No order book data found for {symbol}")
-            
-            return orderbook_entries
-            
-        except Exception as e:
-            print(f"❌ Error crawling order book for {symbol}: {e}")
-            return []
-    
-    def crawl_orderbook_for_token(self, symbol):
-        """Crawl order book data for a specific token - using driver pool"""
-        orderbook_entries = []
-        driver = None
-        
-        try:
-            # Get driver from pool
-            driver = self.get_driver()
-            
-            # Use correct URL pattern for the token
-            url = f'https://www.mexc.com/vi-VN/pre-market/{symbol}'
-            print(f"  🔗 Loading URL: {url}")
-            
-            driver.get(url)
-            
-            # Smart wait for page elements instead of fixed sleep
-            # Wait for page to load
-            wait = WebDriverWait(driver, 15)
-            try:
-                wait.until(EC.any_of(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".order-book-table_sellTable__Dxd2s")),
-                    EC.presence_of_element_located((By.CSS_SELECTOR, ".order-book-table_buyTable__xqBVW"))
-                ))
-                page_loaded = True
-            except:
-                page_loaded = False
-            
-            # Check if page loaded successfully
-            if "404" not in driver.title and "error" not in driver.title.lower() and page_loaded:
-                print(f"  ✅ Successfully loaded order book page for {symbol}")
-                
-                # Extract order book data for this token
-                orderbook_entries = self.extract_orderbook(driver, symbol)
-                
-                if orderbook_entries:
-                    print(f"  📊 Found {len(orderbook_entries)} order book entries")
-                else:
-                    print(f"  ⚠️  No order book data found on {url}")
-            else:
-                print(f"  ❌ Page not found: {url}")
-                
-        except Exception as e:
-            print(f"❌ Error crawling order book for {symbol}: {e}")
-            
-        finally:
-            # Return driver to pool
-            if driver:
-                self.return_driver(driver)
-        
-        return orderbook_entries
+            return bool(driver.execute_async_script(_WAIT_FOR_SELECTOR_JS, selector, int(timeout * 1000)))
+        except TimeoutException:
+            return False
     
-    def extract_orderbook(self, driver, symbol):
-        """Extract order book data for any token - crawl both Mua and Bán orders"""
-        orderbook_entries = []
-        crawled_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        try:
-            print(f"    🔍 Extracting {symbol} order book data...")
-            
-            # Phase 1: Crawl SELL orders (lệnh bán) - table with "Mua" buttons
-            print(f"    🔍 Phase 1: Crawling SELL orders (lệnh bán) with 'Mua' buttons...")
-            sell_entries = self.crawl_order_type(driver, symbol, crawled_at,
-                                               table_selector=".order-book-table_sellTable__Dxd2s",
-                                               price_selector=".order-book-table_sellPrice__xAuZe",
-                                               expected_button="Mua",
-                                               order_type_name="SELL orders")
-            orderbook_entries.extend(sell_entries)
-            
-            # Phase 2: Crawl BUY orders (lệnh mua) - table with "Bán" buttons  
-            print(f"    🔍 Phase 2: Crawling BUY orders (lệnh mua) with 'Bán' buttons...")
-            buy_entries = self.crawl_order_type(driver, symbol, crawled_at,
-                                              table_selector=".order-book-table_buyTable__xqBVW", 
-                                              price_selector=".order-book-table_buyPrice__uY0OB",
-                                              expected_button="Bán",
-                                              order_type_name="BUY orders")
-            orderbook_entries.extend(buy_entries)
-            
-            print(f"    ✅ Total extracted: {len(orderbook_entries)} entries ({len(sell_entries)} SELL + {len(buy_entries)} BUY)")
-            
-        except Exception as e:
-            print(f"    ❌ Error extracting {symbol} order book: {str(e)}")
-        
-        return orderbook_entries
+    def extract_rows(self, driver, table_selector, price_selector=None):
+        """Lấy dữ liệu tất cả row của bảng bằng 1 round trip - trả về list dict cho parse_order_row"""
+        return driver.execute_script(_EXTRACT_ROWS_JS, table_selector, price_selector, CELL_CONTENT_SEL) or []
     
-    def crawl_order_type(self, driver, symbol, crawled_at, table_selector, price_selector, expected_button, order_type_name):
-        """Crawl specific order type (SELL or BUY orders)"""
-        orderbook_entries = []
-        
-        try:
-            # Find the specific table
-            table = driver.find_element(By.CSS_SELECTOR, table_selector)
-            
-            if table:
-                print(f"      ✅ Found {order_type_name} table")
-                
-                # Extract rows from this table
-                rows = table.find_elements(By.CSS_SELECTOR, "tr")
-                
-                # Parse each row
-                valid_entries = 0
-                for i, row in enumerate(rows):
-                    try:
-                        # Skip measurement rows
-                        if self.is_measurement_row(row):
-                            continue
-                        
-                        # Extract order data from row
-                        order_data = self.parse_order_row(row, symbol, price_selector, expected_button)
-                        if order_data:
-                            orderbook_entries.append(order_data)
-                            valid_entries += 1
-                            
-                                
-                    except Exception as e:
-                        print(f"        ❌ Error parsing {order_type_name} row {i+1}: {e}")
-                        continue
-                
-                print(f"      📊 Successfully parsed {valid_entries} entries from {order_type_name}")
-                
-                # Handle pagination for this table
-                pagination_entries = self.handle_mento_pagination(driver, symbol, crawled_at, table_selector, price_selector, expected_button, order_type_name)
-                orderbook_entries.extend(pagination_entries)
-                
-                if pagination_entries:
-                    print(f"      📊 Found {len(pagination_entries)} additional entries from {order_type_name} pagination")
-                
-            else:
-                print(f"      ⚠️  {order_type_name} table not found")
-                
-        except NoSuchElementException:
-            print(f"      ⚠️  {order_type_name} table not found with selector: {table_selector}")
-        except Exception as e:
-            print(f"      ❌ Error with {order_type_name} table: {e}")
-        
-        return orderbook_entries
-
-    def parse_order_row(self, row_element, symbol, price_selector=None, expected_button=None):
-        """Parse order book row for any token - order type comes from button content"""
+    def parse_order_row(self, row_data, ctx):
+        """Parse order book row (dict từ extract_rows) với SymbolCtx của bảng - order type comes from button content"""
         try:
             # Skip measurement rows
-            if self.is_measurement_row(row_element):
+            if self.is_measurement_row(row_data):
                 return None
             
-            # Extract data from row cells
-            cells = row_element.find_elements(By.TAG_NAME, 'td')
-            if len(cells) < 3:
+            # Need price, quantity and total cells
+            if row_data['cell_count'] < 3:
                 return None
             
-            # Extract price from first cell with specific selector
-            price = ''
-            if price_selector:
-                try:
-                    price_element = cells[0].find_element(By.CSS_SELECTOR, price_selector)
-                    price = price_element.text.strip()
-                except:
-                    price = cells[0].text.strip()
-            else:
-                price = cells[0].text.strip()
-            
-            # Extract quantity from second cell
-            quantity = ''
-            try:
-                quantity_element = cells[1].find_element(By.CSS_SELECTOR, ".order-book-table_content__ZSAZ_")
-                quantity = quantity_element.text.strip()
-            except:
-                quantity = cells[1].text.strip()
-            
-            # Extract total from third cell
-            total = ''
-            try:
-                total_element = cells[2].find_element(By.CSS_SELECTOR, ".order-book-table_content__ZSAZ_")
-                total = total_element.text.strip()
-            except:
-                total = cells[2].text.strip()
+            price = row_data['price']
+            quantity = row_data['quantity']
+            total = row_data['total']
             
             # Extract order type from button content (Mua/Bán)
             order_type = ''
-            try:
-                # Look for button with expected text
-                button = row_element.find_element(By.CSS_SELECTOR, "button")
-                button_text = button.text.strip()
-                
-                # Use the actual button text as order type
-                if button_text in ['Mua', 'Bán']:
-                    order_type = button_text
-                else:
-                    # Fallback: look for button content in span
-                    try:
-                        button_span = button.find_element(By.CSS_SELECTOR, "span")
-                        button_span_text = button_span.text.strip()
-                        if button_span_text in ['Mua', 'Bán']:
-                            order_type = button_span_text
-                    except:
-                        pass
-                
-            except NoSuchElementException:
-                pass
+            if row_data['button'] in ['Mua', 'Bán']:
+                order_type = row_data['button']
+            elif row_data['button_span'] in ['Mua', 'Bán']:
+                # Fallback: button content in span
+                order_type = row_data['button_span']
             
             # Use expected button as fallback
-            if not order_type and expected_button:
-                order_type = expected_button
+            if not order_type and ctx.expected_button:
+                order_type = ctx.expected_button
             
             # Skip if no valid data
             if not price and not quantity:
                 return None
             
-            # Convert numeric values and remove commas
-            def clean_numeric(value):
-                if not value:
-                    return None
-                # Remove commas and convert to float
-                clean_value = str(value).replace(',', '').strip()
-                try:
-                    return float(clean_value)
-                except (ValueError, TypeError):
-                    return None
-            
             # Create order entry
             order_entry = {
-                'token_symbol': symbol,
+                'token_symbol': ctx.symbol,
                 'order_type': order_type or 'Unknown',
-                'price': clean_numeric(price),
-                'quantity': clean_numeric(quantity),
-                'total': clean_numeric(total)
+                'price': _clean_numeric(price),
+                'quantity': _clean_numeric(quantity),
+                'total': _clean_numeric(total)
             }
             
             return order_entry
             
         except Exception as e:
-            print(f"        ❌ Error parsing order row: {e}")
+            log.debug("        ❌ Error parsing order row: %s", e)
             return None
     
-    def handle_mento_pagination(self, driver, symbol, crawled_at, table_selector, price_selector=None, expected_button=None, order_type_name=""):
-        """Handle pagination for MENTO - crawl ALL pages for complete data"""
-        pagination_entries = []
+    def is_measurement_row(self, row_data):
+        """Check if this is an Ant Design measurement row that should be skipped"""
+        # Check class name first - dấu hiệu phổ biến nhất của measurement row
+        if 'ant-table-measure-row' in row_data['class_name']:
+            return True
         
-        try:
-            # Look for pagination - use specific selector based on order type
-            if "sellTable" in table_selector:
-                # SELL orders pagination - first pagination wrapper
-                pagination_selectors = [
-                    ".order-book-table_paginationWrapper__O_FJg:first-of-type",
-                    ".order-book-table_sellTable__Dxd2s + .order-book-table_paginationWrapper__O_FJg",
-                    ".ant-pagination",
-                    "[class*='pagination']"
-                ]
-            elif "buyTable" in table_selector:
-                # BUY orders pagination - second pagination wrapper
-                pagination_selectors = [
-                    ".order-book-table_buyTable__xqBVW .order-book-table_paginationWrapper__O_FJg",
-                    ".order-book-table_buyTable__xqBVW + .order-book-table_paginationWrapper__O_FJg",
-                    ".order-book-table_paginationWrapper__O_FJg:last-of-type",
-                    ".ant-pagination",
-                    "[class*='pagination']"
-                ]
-            else:
-                # Fallback
-                pagination_selectors = [
-                    ".order-book-table_paginationWrapper__O_FJg",
-                    ".ant-pagination",
-                    "[class*='pagination']"
-                ]
-            
-            pagination = None
-            for selector in pagination_selectors:
-                try:
-                    pagination = driver.find_element(By.CSS_SELECTOR, selector)
-                    print(f"      ✅ Found pagination with selector: {selector}")
-                    break
-                except NoSuchElementException:
-                    continue
-            
-            if not pagination:
-                print(f"      ℹ️  No pagination found for {order_type_name}")
-                return pagination_entries
-            
-            # Get page numbers
-            page_items = pagination.find_elements(By.CSS_SELECTOR, ".ant-pagination-item")
-            if not page_items:
-                print(f"      ℹ️  No page items found")
-                return pagination_entries
-            
-            # Get available page numbers (only crawl pages that actually exist)
-            available_pages = []
-            for item in page_items:
-                try:
-                    page_num = int(item.get_attribute('title'))
-                    available_pages.append(page_num)
-                except:
-                    continue
-            
-            # Sort and get max page
-            available_pages.sort()
-            max_page = max(available_pages) if available_pages else 1
-            
-            print(f"      📄 Processing ALL pages from 1 to {max_page} for {order_type_name}")
-            
-            # Process ALL pages from 2 to max_page for both order types
-            if max_page > 1:
-                pages_to_process = list(range(2, max_page + 1))
-                
-                for page_num in pages_to_process:
-                    try:
-                        print(f"      🔄 Processing page {page_num}...")
-                        
-                        # Find and click page link with multiple approaches
-                        page_link = None
-                        page_selectors = [
-                            f".ant-pagination-item-{page_num}",
-                            f"[title='{page_num}']",
-                            f"li[title='{page_num}']",
-                            f"a[title='{page_num}']",
-                            f"button[title='{page_num}']"
-                        ]
-                        
-                        for selector in page_selectors:
-                            try:
-                                page_link = pagination.find_element(By.CSS_SELECTOR, selector)
-                                print(f"        ✅ Found page link with selector: {selector}")
-                                break
-                            except NoSuchElementException:
-                                continue
-                        
-                        # If still not found, try finding by text content
-                        if not page_link:
-                            try:
-                                page_links = pagination.find_elements(By.CSS_SELECTOR, ".ant-pagination-item")
-                                for link in page_links:
-                                    if link.text.strip() == str(page_num):
-                                        page_link = link
-                                        print(f"        ✅ Found page link by text content: {page_num}")
-                                        break
-                            except:
-                                pass
-                        
-                        # If still not found, try finding by index (if we know the order)
-                        if not page_link:
-                            try:
-                                page_links = pagination.find_elements(By.CSS_SELECTOR, ".ant-pagination-item")
-                                if page_num - 1 < len(page_links):  # page_num is 1-indexed, array is 0-indexed
-                                    page_link = page_links[page_num - 1]
-                                    print(f"        ✅ Found page link by index: {page_num}")
-                            except:
-                                pass
-                        
-                        # If still not found, try to click next/prev buttons to reveal more pages
-                        if not page_link and page_num <= 9:
-                            try:
-                                # Try clicking next button to reveal more pages
-                                next_button = pagination.find_element(By.CSS_SELECTOR, ".ant-pagination-next")
-                                if next_button.is_enabled():
-                                    driver.execute_script("arguments[0].click();", next_button)
-                                    time.sleep(1)  # Simple wait
-                                    
-                                    # Try to find the page link again
-                                    for selector in page_selectors:
-                                        try:
-                                            page_link = pagination.find_element(By.CSS_SELECTOR, selector)
-                                            print(f"        ✅ Found page link after clicking next: {selector}")
-                                            break
-                                        except NoSuchElementException:
-                                            continue
-                            except:
-                                pass
-                        
-                        if page_link:
-                            # Click page link
-                            driver.execute_script("arguments[0].click();", page_link)
-                            print(f"        ✅ Clicked page {page_num}")
-                            
-                            # Smart wait for data to load instead of fixed sleep
-                            time.sleep(1)  # Simple wait
-                            
-                            # Wait for pagination to update and show current page
-                            max_wait_attempts = 10
-                            for attempt in range(max_wait_attempts):
-                                try:
-                                    # Check if pagination shows we're on the correct page
-                                    active_item = pagination.find_element(By.CSS_SELECTOR, ".ant-pagination-item-active")
-                                    active_page = int(active_item.get_attribute('title'))
-                                    if active_page == page_num:
-                                        print(f"        ✅ Confirmed on page {page_num}")
-                                        break
-                                    else:
-                                        print(f"        ⏳ Waiting for page {page_num}, currently on {active_page} (attempt {attempt+1})")
-                                        time.sleep(0.5)  # Simple wait
-                                except:
-                                    print(f"        ⏳ Waiting for pagination to update (attempt {attempt+1})")
-                                    time.sleep(0.5)  # Simple wait
-                            
-                            # Smart wait for table data to refresh
-                            time.sleep(1)  # Simple wait
-                            
-                            # Scroll to trigger any lazy loading
-                            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                            time.sleep(1)  # Simple wait
-                            driver.execute_script("window.scrollTo(0, 0);")
-                            time.sleep(1)  # Simple wait
-                            
-                            # Extract data from current page
-                            try:
-                                table = driver.find_element(By.CSS_SELECTOR, table_selector)
-                                rows = table.find_elements(By.CSS_SELECTOR, "tr")
-                                
-                                page_entries = []
-                                # Create new timestamp for this page
-                                page_crawled_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                                
-                                for row in rows:
-                                    if not self.is_measurement_row(row):
-                                        order_data = self.parse_order_row(row, symbol, price_selector, expected_button)
-                                        if order_data:
-                                            page_entries.append(order_data)
-                                
-                                # Debug: Show first few entries from this page to verify data is different
-                                pagination_entries.extend(page_entries)
-                                print(f"        📊 Page {page_num}: {len(page_entries)} entries")
-                                
-                            except Exception as e:
-                                print(f"      ❌ Error extracting page {page_num}: {e}")
-                        else:
-                            print(f"      ❌ Page {page_num} link not found - trying to scroll and wait...")
-                            # Try scrolling to see if more pagination appears
-                            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                            time.sleep(1)  # Simple wait
-                            driver.execute_script("window.scrollTo(0, 0);")
-                            time.sleep(1)  # Simple wait
-                            
-                            # Try to find the page link again after scrolling
-                            for selector in page_selectors:
-                                try:
-                                    page_link = pagination.find_element(By.CSS_SELECTOR, selector)
-                                    print(f"        ✅ Found page link after scrolling with selector: {selector}")
-                                    break
-                                except NoSuchElementException:
-                                    continue
-                            
-                            if page_link:
-                                driver.execute_script("arguments[0].click();", page_link)
-                                print(f"        ✅ Clicked page {page_num} after scrolling")
-                                time.sleep(1)  # Simple wait
-                            else:
-                                print(f"      ❌ Page {page_num} still not found after scrolling")
-                            
-                    except Exception as e:
-                        print(f"      ❌ Error processing page {page_num}: {e}")
-                        continue
-                
-                print(f"      ✅ Completed FULL pagination for {order_type_name}: {len(pagination_entries)} additional entries from {max_page-1} pages")
-            else:
-                print(f"      ℹ️  Only 1 page available for {order_type_name}, no pagination needed")
-                
-        except Exception as e:
-            print(f"      ❌ Error handling pagination: {e}")
+        # Check aria-hidden attribute
+        if row_data['aria_hidden'] == 'true':
+            return True
         
-        return pagination_entries
-    
-    def is_measurement_row(self, row_element):
-        """Check if this is an Ant Design measurement row that should be skipped"""
-        try:
-            # Check aria-hidden attribute
-            aria_hidden = row_element.get_attribute('aria-hidden')
-            if aria_hidden == 'true':
-                return True
-            
-            # Check class name
-            class_name = row_element.get_attribute('class') or ''
-            if 'ant-table-measure-row' in class_name:
-                return True
-            
-            # Check style
-            style = row_element.get_attribute('style') or ''
-            if 'height: 0px' in style and 'font-size: 0px' in style:
-                return True
-            
-            return False
-            
-        except:
-            return False
+        # Check style
+        style = row_data['style']
+        if 'height: 0px' in style and 'font-size: 0px' in style:
+            return True
+        
+        return False
     
-    def extract_token_data(self, element):
-        """Extract token data from element"""
+    def extract_token_data(self, item_text, now_str=None):
+        """Extract token data from token item text - now_str là created_at dùng chung cho cả batch"""
         try:
-            item_text = element.text
-            if not item_text.strip():
+            if not item_text or not item_text.strip():
                 return None
             
             # Extract token name and symbol from element
@@ -1524,10 +1547,10 @@ class MexcPreMarketCrawler:
                 name = lines[1].strip()
                 
                 # Clean up symbol (remove any extra characters)
-                symbol = re.sub(r'[^A-Za-z0-9]', '', symbol)
+                symbol = _RE_SYMBOL_CLEAN.sub('', symbol)
                 
                 # Clean up name (remove any extra characters)
-                name = re.sub(r'\s+', ' ', name).strip()
+                name = _RE_SPACES.sub(' ', name).strip()
             
             token_data = {
                 'name': name,
@@ -1538,64 +1561,35 @@ class MexcPreMarketCrawler:
                 'total_volume': '',
                 'start_time': None,
                 'end_time': None,
-                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                'created_at': now_str or _now_str()
             }
             
             # Extract latest price
-            price_pattern = r'Giá giao dịch mới nhất\s*([\d,]+\.?\d*)'
-            price_match = re.search(price_pattern, item_text)
-            if price_match:
-                # Remove commas and convert to float
-                price_str = price_match.group(1).replace(',', '')
-                token_data['latest_price'] = float(price_str)
+            price_str = _number_after(item_text, 'Giá giao dịch mới nhất', _RE_NUM)
+            if price_str:
+                token_data['latest_price'] = Decimal(price_str)
             
             # Extract percentage change (remove % sign for numeric field)
-            change_pattern = r'([+-]?\d+\.?\d*)%'
-            change_match = re.search(change_pattern, item_text)
+            change_match = _RE_CHANGE.search(item_text)
             if change_match:
-                token_data['price_change_percent'] = float(change_match.group(1))
+                token_data['price_change_percent'] = Decimal(change_match.group(1))
             
             # Extract volume 24h
-            volume_24h_pattern = r'Khối lượng 24 giờ\s*([\d,]+\.?\d*[KMB]?)'
-            volume_24h_match = re.search(volume_24h_pattern, item_text)
-            if volume_24h_match:
-                volume_str = volume_24h_match.group(1).replace(',', '')
+            volume_str = _number_after(item_text, 'Khối lượng 24 giờ', _RE_VOLUME_NUM)
+            if volume_str:
                 # Convert K/M/B suffixes to numeric values
-                if volume_str.endswith('K'):
-                    token_data['volume_24h'] = float(volume_str[:-1]) * 1000
-                elif volume_str.endswith('M'):
-                    token_data['volume_24h'] = float(volume_str[:-1]) * 1000000
-                elif volume_str.endswith('B'):
-                    token_data['volume_24h'] = float(volume_str[:-1]) * 1000000000
-                else:
-                    token_data['volume_24h'] = float(volume_str)
+                token_data['volume_24h'] = _parse_volume(volume_str)
             
             # Extract total volume
-            total_volume_pattern = r'Tổng khối lượng\s*([\d,]+\.?\d*[KMB]?)'
-            total_volume_match = re.search(total_volume_pattern, item_text)
-            if total_volume_match:
-                volume_str = total_volume_match.group(1).replace(',', '')
-                # Convert K/M/B suffixes to numeric values
-                if volume_str.endswith('K'):
-                    token_data['total_volume'] = float(volume_str[:-1]) * 1000
-                elif volume_str.endswith('M'):
-                    token_data['total_volume'] = float(volume_str[:-1]) * 1000000
-                elif volume_str.endswith('B'):
-                    token_data['total_volume'] = float(volume_str[:-1]) * 1000000000
-                else:
-                    token_data['total_volume'] = float(volume_str)
+            volume_str = _number_after(item_text, 'Tổng khối lượng', _RE_VOLUME_NUM)
+            if volume_str:
+                token_data['total_volume'] = _parse_volume(volume_str)
             
             # Extract timestamps
-            time_pattern = r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})'
-            time_matches = re.findall(time_pattern, item_text)
+            time_matches = _RE_TIME.findall(item_text)
             
             # Check for status patterns first
-            status_patterns = [r'Đợi xác nhận', r'Đã kết thúc', r'Đang diễn ra', r'Đang xác nhận']
-            has_status = False
-            for pattern in status_patterns:
-                if re.search(pattern, item_text):
-                    has_status = True
-                    break
+            has_status = _RE_STATUS.search(item_text) is not None
             
             if time_matches:
                 # Has timestamps
@@ -1628,46 +1622,16 @@ class MexcPreMarketCrawler:
         filename = f"mexc_mento_data_{timestamp}.txt"
         
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                # Write header
-                f.write("=== MEXC MENTO TOKEN CRAWLER DATA ===\n")
-                f.write(f"Crawled at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Total tokens: {len(self.tokens_data)}\n")
-                f.write(f"Total order book entries: {len(self.orderbook_data)}\n")
-                f.write("=" * 60 + "\n\n")
-                
-                # Write token data
-                f.write("=== TOKEN DATA ===\n")
-                f.write("Name\tSymbol\tLatest Price\tPrice Change %\tVolume 24h\tTotal Volume\tStart Time\tEnd Time\tCrawled At\n")
-                
-                for token in self.tokens_data:
-                    line = f"{token.get('name', '')}\t"
-                    line += f"{token.get('symbol', '')}\t"
-                    line += f"{token.get('latest_price', '')}\t"
-                    line += f"{token.get('price_change_percent', '')}\t"
-                    line += f"{token.get('volume_24h', '')}\t"
-                    line += f"{token.get('total_volume', '')}\t"
-                    line += f"{token.get('start_time', '')}\t"
-                    line += f"{token.get('end_time', '')}\t"
-                    line += f"{token.get('crawled_at', '')}\n"
-                    f.write(line)
-                
-                f.write("\n" + "=" * 60 + "\n")
-                
-                # Write order book data
-                f.write("=== MENTO ORDER BOOK DATA ===\n")
-                f.write("Token Symbol\tCrawled At\tOrder Type\tPrice\tQuantity\tTotal\n")
-                
-                for order in self.orderbook_data:
-                    line = f"{order.get('token_symbol', '')}\t"
-                    line += f"{order.get('crawled_at', '')}\t"
-                    line += f"{order.get('order_type', '')}\t"
-                    line += f"{order.get('price', '')}\t"
-                    line += f"{order.get('quantity', '')}\t"
-                    line += f"{order.get('total', '')}\n"
-                    f.write(line)
-                
-                f.write("\n" + "=" * 60 + "\n")
+            # orderbook_data là dict {symbol: [orders]} sau Phase 2
+            orders = self.orderbook_data
+            if isinstance(orders, dict):
+                orders = [order for token_orders in orders.values() for order in token_orders]
+            
+            # Buffer 1MB để gom các lần write() thành ít syscall hơn
+            with open(filename, 'w', encoding='utf-8', buffering=1 << 20, newline='\n') as f:
+                f.writelines(_render_header(len(self.tokens_data), len(orders)))
+                f.writelines(_render_tokens(self.tokens_data))
+                f.writelines(_render_orders(orders))
                 f.write("END OF MENTO DATA\n")
             
             print(f"✅ All MENTO data saved to: {filename}")
@@ -1678,6 +1642,7 @@ class MexcPreMarketCrawler:
 
 def main():
     """Main function to crawl all pre-market tokens"""
+    logging.basicConfig(level=CRAWLER_CONFIG.get('log_level', 'INFO'), format='%(message)s')
     start_time = time.time()
     start_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     